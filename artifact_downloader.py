@@ -0,0 +1,134 @@
+import fnmatch
+import json
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ARTIFACTS_CACHE_PATH = os.getenv(
+    'ARTIFACTS_CACHE_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/artifacts')
+)
+
+# Bytes read per chunk while streaming an archive to disk
+CHUNK_SIZE = 1024 * 1024
+
+class ArtifactDownloader:
+    """Streams job artifact archives into a local cache and extracts chosen members"""
+
+    def __init__(self, fetcher, cache_dir=ARTIFACTS_CACHE_PATH):
+        self.fetcher = fetcher
+        self.cache_dir = cache_dir
+
+    def archive_info(self, job):
+        """Size and name of the job's artifact archive, or None when it has none"""
+        archive = getattr(job, 'artifacts_file', None) or {}
+        if not archive.get('filename'):
+            return None
+        return {"filename": archive['filename'], "size": archive.get('size')}
+
+    def cached_archive(self, job, info):
+        """Return the cached archive path if it matches the job's current archive"""
+        job_dir = os.path.join(self.cache_dir, str(job.id))
+        archive_path = os.path.join(job_dir, info["filename"])
+        meta_path = os.path.join(job_dir, "meta.json")
+
+        try:
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if (meta.get("size") == info["size"] and os.path.isfile(archive_path)
+                and os.path.getsize(archive_path) == info["size"]):
+            return archive_path
+        return None
+
+    def download_archive(self, job):
+        """Stream a job's artifact archive to the cache without buffering it in memory"""
+        info = self.archive_info(job)
+        if info is None:
+            print(f"✗ Job {job.id} ({job.name}) has no artifacts")
+            return None
+
+        cached = self.cached_archive(job, info)
+        if cached:
+            print(f"✓ Job {job.id}: using cached {info['filename']} ({info['size']} bytes)")
+            return cached
+
+        job_dir = os.path.join(self.cache_dir, str(job.id))
+        os.makedirs(job_dir, exist_ok=True)
+        archive_path = os.path.join(job_dir, info["filename"])
+        partial_path = f"{archive_path}.part"
+
+        print(f"⬇️  Job {job.id}: downloading {info['filename']} ({info['size']} bytes)...")
+        full_job = self.fetcher.project.jobs.get(job.id, lazy=True)
+        with open(partial_path, 'wb') as file:
+            for chunk in full_job.artifacts(streamed=True, iterator=True, chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+        os.replace(partial_path, archive_path)
+
+        with open(os.path.join(job_dir, "meta.json"), 'w') as file:
+            json.dump({"job_id": job.id, "job_name": job.name, "pipeline_id": job.pipeline['id'], **info}, file)
+
+        print(f"✓ Job {job.id}: saved {archive_path}")
+        return archive_path
+
+    def extract_members(self, archive_path, destination, patterns=None):
+        """Extract members matching any path or glob in patterns (all when empty)"""
+        extracted = []
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                if patterns and not any(fnmatch.fnmatch(member.filename, pattern) for pattern in patterns):
+                    continue
+
+                target = os.path.realpath(os.path.join(destination, member.filename))
+                if not target.startswith(os.path.realpath(destination) + os.sep):
+                    print(f"⚠️ Skipping unsafe archive path: {member.filename}")
+                    continue
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(member) as source, open(target, 'wb') as file:
+                    shutil.copyfileobj(source, file, CHUNK_SIZE)
+                extracted.append(target)
+
+        return extracted
+
+    def fetch_pipeline(self, pipeline_id, destination, job_name="runscript_prod", patterns=None):
+        """Download (or reuse) the artifacts of a pipeline's job and extract the chosen members"""
+        try:
+            jobs = self.fetcher.get_pipeline_jobs(pipeline_id)
+            job = jobs.get(job_name)
+            if job is None:
+                print(f"✗ Pipeline {pipeline_id} has no job named {job_name}")
+                return None
+
+            archive_path = self.download_archive(job)
+            if archive_path is None:
+                return None
+
+            if patterns is None:
+                return [archive_path]
+
+            pipeline_destination = os.path.join(destination, str(pipeline_id))
+            extracted = self.extract_members(archive_path, pipeline_destination, patterns)
+            print(f"✓ Pipeline {pipeline_id}: extracted {len(extracted)} member(s) to {pipeline_destination}")
+            return extracted
+
+        except Exception as e:
+            print(f"Error fetching artifacts for pipeline {pipeline_id}: {e}")
+            return None
+
+    def fetch_pipelines(self, pipeline_ids, destination, job_name="runscript_prod", patterns=None, workers=4):
+        """Fetch several pipelines' artifacts concurrently; returns {pipeline_id: paths or None}"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.fetch_pipeline, pipeline_id, destination, job_name, patterns): pipeline_id
+                for pipeline_id in pipeline_ids
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
@@ -0,0 +1,390 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_automation import GitLabPipelineAutomator
+from ref_catalog import RefCatalog
+from request_scheduler import DEFAULT_BURST, DEFAULT_RATE, scheduler
+
+COOKIES_PATH = os.getenv(
+    'BROWSER_POOL_COOKIES_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/cookies.json')
+)
+
+# A worker is replaced after this many pipelines or this much browser memory growth
+DEFAULT_MAX_RUNS = 20
+DEFAULT_MAX_MEMORY_GROWTH_MB = 500
+
+# A task still running after this many seconds is failed and its worker killed
+DEFAULT_TASK_TIMEOUT = 600
+
+def process_tree_pids(pid):
+    """A process and all its descendants (Linux /proc only)"""
+    pids = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        for task in os.listdir(f"/proc/{current}/task"):
+            with open(f"/proc/{current}/task/{task}/children") as file:
+                pending.extend(int(child) for child in file.read().split())
+    return pids
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants in MB (Linux /proc only)"""
+    total_kb = 0
+    try:
+        for current in process_tree_pids(pid):
+            with open(f"/proc/{current}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+    except (OSError, ValueError):
+        return None
+    return total_kb / 1024
+
+def kill_process_tree(process):
+    """Kill a worker process together with the chromedriver and Chrome it started"""
+    try:
+        pids = process_tree_pids(process.pid)
+    except (OSError, ValueError):
+        pids = [process.pid]
+    for pid in reversed(pids):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    process.join(timeout=30)
+
+def browser_rss_mb(automator):
+    """Memory of the chromedriver process and the browser it started, if measurable"""
+    try:
+        return process_tree_rss_mb(automator.driver.service.process.pid)
+    except Exception:
+        return None
+
+def start_worker_browser(automator, cookies_path):
+    return automator.start_headless_chrome() and automator.load_cookies(cookies_path)
+
+def worker_main(worker_id, task_queue, result_queue, config):
+    """Worker process: one headless browser creating the pipelines the pool assigns to it
+
+    Reports "ready" whenever it can take a task and then waits on its own
+    queue. Exits (and is replaced by the pool) after max_runs tasks, when
+    the browser grows by more than max_memory_growth_mb, when it fails a
+    health check, or when the pool sends None.
+    """
+    # Each process has its own scheduler; split the request budget between workers
+    scheduler.rate = config["rate"]
+    scheduler.burst = config["burst"]
+    scheduler.tokens = float(config["burst"])
+
+    automator = GitLabPipelineAutomator()
+    if not start_worker_browser(automator, config["cookies_path"]):
+        result_queue.put(("retired", worker_id, "browser failed to start"))
+        automator.close()
+        return
+
+    baseline_mb = browser_rss_mb(automator)
+    runs = 0
+    reason = "queue drained"
+
+    try:
+        while True:
+            if runs >= config["max_runs"]:
+                reason = f"recycled after {runs} runs"
+                break
+
+            memory_mb = browser_rss_mb(automator)
+            if baseline_mb and memory_mb and memory_mb - baseline_mb > config["max_memory_growth_mb"]:
+                reason = f"recycled after memory grew to {memory_mb:.0f} MB"
+                break
+
+            if not automator.is_healthy():
+                reason = "failed health check"
+                break
+
+            result_queue.put(("ready", worker_id))
+            index, task = task_queue.get()
+            if task is None:
+                break
+
+            started = time.monotonic()
+            pipeline_id = None
+
+            if automator.create_pipeline(task.get("branch", "production"), task["ticket"],
+                                         task["script"], task["ejar_service"]):
+                automator.wait_for_pipeline_page()
+                pipeline_id = automator.capture_pipeline_id()
+
+            runs += 1
+            result_queue.put(("result", worker_id, index, pipeline_id, time.monotonic() - started))
+    finally:
+        result_queue.put(("retired", worker_id, reason))
+        automator.close()
+
+class BrowserWorkerPool:
+    """Pool of isolated headless browser processes, each fed through its own task queue
+
+    The supervisor hands a task to a worker only when that worker reports
+    "ready", and remembers which task every worker holds and since when.
+    A task whose worker crashes or exceeds task_timeout is therefore always
+    known, and is reported as failed rather than run a second time.
+    """
+
+    def __init__(self, size=None, max_runs=DEFAULT_MAX_RUNS,
+                 max_memory_growth_mb=DEFAULT_MAX_MEMORY_GROWTH_MB, cookies_path=COOKIES_PATH,
+                 task_timeout=DEFAULT_TASK_TIMEOUT):
+        self.size = size or os.cpu_count() or 1
+        self.task_timeout = task_timeout
+        self.config = {
+            "max_runs": max_runs,
+            "max_memory_growth_mb": max_memory_growth_mb,
+            "cookies_path": cookies_path,
+            "rate": DEFAULT_RATE / self.size,
+            "burst": max(1, DEFAULT_BURST // self.size),
+        }
+        self.result_queue = multiprocessing.Queue()
+        self.workers = {}
+        self.task_queues = {}
+        self.next_worker_id = 0
+        self.stats = {}
+
+    def spawn_worker(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+
+        task_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_id, task_queue, self.result_queue, self.config),
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.task_queues[worker_id] = task_queue
+        self.stats[worker_id] = {"runs": 0, "created": 0, "failed": 0, "busy_seconds": 0.0,
+                                 "started_at": time.monotonic(), "retired": None}
+        print(f"🚀 Started browser worker {worker_id} (pid {process.pid})")
+
+    def remove_worker(self, worker_id, reason):
+        """Forget a worker that retired, crashed or was killed"""
+        self.workers.pop(worker_id, None)
+        self.task_queues.pop(worker_id, None)
+        if not self.stats[worker_id]["retired"]:
+            self.stats[worker_id]["retired"] = reason
+
+    def run(self, tasks):
+        """Create a pipeline for every task; returns a pipeline ID (or None) per task"""
+        results = [None] * len(tasks)
+        pending = list(range(len(tasks)))
+        assigned = {}
+        remaining = len(tasks)
+        start_failures = 0
+
+        for _ in range(min(self.size, len(tasks))):
+            self.spawn_worker()
+
+        while remaining:
+            try:
+                message = self.result_queue.get(timeout=5)
+            except queue.Empty:
+                message = None
+
+            if message and message[0] == "ready":
+                worker_id = message[1]
+                if worker_id in self.task_queues:
+                    if pending:
+                        index = pending.pop(0)
+                        assigned[worker_id] = (index, time.monotonic())
+                        self.task_queues[worker_id].put((index, tasks[index]))
+                    else:
+                        self.task_queues[worker_id].put((None, None))
+
+            elif message and message[0] == "result":
+                _, worker_id, index, pipeline_id, seconds = message
+                if assigned.get(worker_id, (None,))[0] == index:
+                    del assigned[worker_id]
+                    results[index] = pipeline_id
+                    remaining -= 1
+                    start_failures = 0
+
+                    stats = self.stats[worker_id]
+                    stats["runs"] += 1
+                    stats["busy_seconds"] += seconds
+                    stats["created" if pipeline_id else "failed"] += 1
+                    status = f"pipeline {pipeline_id}" if pipeline_id else "FAILED"
+                    print(f"{'✓' if pipeline_id else '✗'} Worker {worker_id}: task {index} -> {status} ({seconds:.0f}s)")
+
+            elif message and message[0] == "retired":
+                _, worker_id, reason = message
+                print(f"♻️  Worker {worker_id} retired: {reason}")
+                process = self.workers.get(worker_id)
+                if process:
+                    process.join(timeout=30)
+                self.remove_worker(worker_id, reason)
+                if reason == "browser failed to start":
+                    start_failures += 1
+
+            # Health check: a worker that exited with an error code has crashed.
+            # Workers exiting cleanly always send "retired" last, handled above.
+            for worker_id, process in list(self.workers.items()):
+                if process.exitcode not in (None, 0):
+                    print(f"💥 Worker {worker_id} crashed with exit code {process.exitcode}")
+                    self.remove_worker(worker_id, f"crashed (exit code {process.exitcode})")
+
+            # Deadline: a worker stuck on one task for too long is killed
+            for worker_id, (index, assigned_at) in list(assigned.items()):
+                if worker_id in self.workers and time.monotonic() - assigned_at > self.task_timeout:
+                    print(f"⏰ Worker {worker_id}: task {index} exceeded {self.task_timeout}s, killing the worker")
+                    kill_process_tree(self.workers[worker_id])
+                    self.remove_worker(worker_id, f"killed after task {index} timed out")
+
+            # A task whose worker is gone may already have created its pipeline,
+            # so it is reported as failed rather than run a second time
+            for worker_id in [worker_id for worker_id in assigned if worker_id not in self.workers]:
+                index, _ = assigned.pop(worker_id)
+                self.stats[worker_id]["failed"] += 1
+                print(f"✗ Task {index} lost with worker {worker_id}; check GitLab before re-running it")
+                remaining -= 1
+
+            if start_failures >= 2 * self.size:
+                print("❌ Browser workers keep failing to start, giving up on remaining tasks")
+                break
+
+            # Keep the pool at full size while work is left
+            while remaining and len(self.workers) < min(self.size, remaining):
+                self.spawn_worker()
+
+        self.shutdown()
+        return results
+
+    def shutdown(self):
+        for task_queue in self.task_queues.values():
+            task_queue.put((None, None))
+        for worker_id, process in self.workers.items():
+            process.join(timeout=30)
+            if process.exitcode is None:
+                kill_process_tree(process)
+                self.stats[worker_id]["retired"] = "killed at shutdown"
+        self.workers = {}
+        self.task_queues = {}
+
+        # Pick up the final "retired" messages for the stats
+        while True:
+            try:
+                message = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                break
+            if message[0] == "retired" and not self.stats[message[1]]["retired"]:
+                self.stats[message[1]]["retired"] = message[2]
+
+    def print_stats(self):
+        print("\n📊 Browser worker throughput")
+        print("=" * 60)
+        for worker_id, stats in self.stats.items():
+            elapsed_minutes = max((time.monotonic() - stats["started_at"]) / 60, 1 / 60)
+            average = stats["busy_seconds"] / stats["runs"] if stats["runs"] else 0
+            print(f"Worker {worker_id}: {stats['runs']} run(s), {stats['created']} created, "
+                  f"{stats['failed']} failed, {average:.0f}s avg, "
+                  f"{stats['runs'] / elapsed_minutes:.2f}/min | {stats['retired'] or 'running'}")
+
+def load_tasks(path):
+    """Read pipeline-creation tasks from a JSON Lines file"""
+    with open(path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def preflight_tasks(tasks):
+    """Validate every task against the ref/service catalog before any browser starts"""
+    catalog = RefCatalog()
+    catalog.refresh_refs()
+    problems = catalog.validate_entries(tasks)
+
+    for index, task in enumerate(tasks):
+        missing = [key for key in ("ticket", "script", "ejar_service") if not task.get(key)]
+        if missing:
+            problems.setdefault(index, []).append(f"Missing {', '.join(missing)}")
+
+    for index, errors in sorted(problems.items()):
+        for error in errors:
+            print(f"✗ Task {index}: {error}")
+    return not problems
+
+def monitor_created_pipelines(tasks, pipeline_ids, workers):
+    """Follow created pipelines through the jobs API (no browser needed)"""
+    def monitor(task, pipeline_id):
+        automator = GitLabPipelineAutomator()
+        try:
+            automator.ejar_service = task["ejar_service"]
+            automator.branch_name = task.get("branch", "production")
+            automator.pipeline_id = pipeline_id
+            return automator.execute_pipeline_via_api()
+        finally:
+            automator.close()
+
+    created = [(task, pipeline_id) for task, pipeline_id in zip(tasks, pipeline_ids) if pipeline_id]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(lambda pair: monitor(*pair), created))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Create GitLab pipelines in parallel with a pool of headless browsers',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Tasks file (JSON Lines):
+  {"ticket": "ES-3456", "script": "check_user_eligibility", "ejar_service": "ejar3-sec"}
+  {"ticket": "TASK-123", "script": "update_contract_status", "ejar_service": "ejar3-core-app", "branch": "uat"}
+
+Examples:
+  python browser_pool.py --tasks tasks.jsonl
+  python browser_pool.py --tasks tasks.jsonl --workers 4 --max-runs 10 --monitor
+        """
+    )
+    parser.add_argument('--tasks', required=True, help='JSON Lines file with one pipeline per line')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Browser worker processes (default: CPU count)')
+    parser.add_argument('--max-runs', type=int, default=DEFAULT_MAX_RUNS,
+                        help=f'Recycle a worker after this many pipelines (default: {DEFAULT_MAX_RUNS})')
+    parser.add_argument('--max-memory-mb', type=int, default=DEFAULT_MAX_MEMORY_GROWTH_MB,
+                        help=f'Recycle a worker when its browser grows by this many MB (default: {DEFAULT_MAX_MEMORY_GROWTH_MB})')
+    parser.add_argument('--task-timeout', type=int, default=DEFAULT_TASK_TIMEOUT,
+                        help=f'Fail a task and kill its worker after this many seconds (default: {DEFAULT_TASK_TIMEOUT})')
+    parser.add_argument('--cookies', default=COOKIES_PATH, help=f'Shared login cookies (default: {COOKIES_PATH})')
+    parser.add_argument('--export-cookies', action='store_true',
+                        help='Export login cookies from the Chrome started with --remote-debugging-port=9222 first')
+    parser.add_argument('--monitor', action='store_true', help='Follow created pipelines to completion via the jobs API')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    tasks = load_tasks(args.tasks)
+    if not preflight_tasks(tasks):
+        sys.exit(1)
+
+    if args.export_cookies or not os.path.exists(args.cookies):
+        os.makedirs(os.path.dirname(args.cookies) or '.', exist_ok=True)
+        exporter = GitLabPipelineAutomator()
+        try:
+            if not exporter.connect_to_existing_chrome() or not exporter.export_cookies(args.cookies):
+                sys.exit(1)
+        finally:
+            # Detach without closing the user's own browser window
+            exporter.driver = None
+            exporter.close()
+
+    pool = BrowserWorkerPool(args.workers, args.max_runs, args.max_memory_mb, args.cookies, args.task_timeout)
+    pipeline_ids = pool.run(tasks)
+    pool.print_stats()
+
+    success = all(pipeline_ids)
+    if args.monitor:
+        success = all(monitor_created_pipelines(tasks, pipeline_ids, args.workers)) and success
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,192 @@
+import os
+import shlex
+import sqlite3
+from datetime import datetime
+
+INDEX_PATH = os.getenv(
+    'OUTPUT_INDEX_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/output_index.db')
+)
+
+class PipelineOutputIndex:
+    """Local full-text index over archived runscript outputs and script bodies"""
+
+    def __init__(self, path=INDEX_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.create_schema()
+
+    def create_schema(self):
+        """Create the metadata table and the FTS5 inverted index if missing"""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pipelines (
+                pipeline_id INTEGER PRIMARY KEY,
+                service TEXT,
+                ticket TEXT,
+                ref TEXT,
+                status TEXT,
+                created_at TEXT,
+                indexed_at TEXT,
+                output_rowid INTEGER,
+                script_rowid INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS pipelines_service ON pipelines (service);
+            CREATE INDEX IF NOT EXISTS pipelines_ticket ON pipelines (ticket);
+            CREATE INDEX IF NOT EXISTS pipelines_created_at ON pipelines (created_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5 (
+                pipeline_id UNINDEXED,
+                kind UNINDEXED,
+                content
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # Indexes created before the document rowids were tracked
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(pipelines)")}
+        for column in ("output_rowid", "script_rowid"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE pipelines ADD COLUMN {column} INTEGER")
+        self.conn.commit()
+
+    def is_indexed(self, pipeline_id):
+        """Check whether a pipeline has already been indexed"""
+        row = self.conn.execute(
+            "SELECT 1 FROM pipelines WHERE pipeline_id = ?", (pipeline_id,)
+        ).fetchone()
+        return row is not None
+
+    def delete_documents(self, pipeline_id):
+        """Remove a pipeline's documents by FTS rowid, without scanning the whole table"""
+        row = self.conn.execute(
+            "SELECT output_rowid, script_rowid FROM pipelines WHERE pipeline_id = ?", (pipeline_id,)
+        ).fetchone()
+        if row is None:
+            return
+        rowids = [rowid for rowid in row if rowid is not None]
+        if rowids:
+            self.conn.execute(
+                f"DELETE FROM documents WHERE rowid IN ({', '.join('?' * len(rowids))})", rowids
+            )
+        else:
+            # Pipelines indexed before rowids were tracked
+            self.conn.execute("DELETE FROM documents WHERE pipeline_id = ?", (pipeline_id,))
+
+    def watermark(self):
+        """Highest job ID below which every job has already been scanned"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        return int(row[0]) if row else 0
+
+    def set_watermark(self, job_id):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (str(job_id),)
+            )
+
+    def add_pipeline(self, pipeline_id, output="", script="", service=None, ticket=None,
+                     ref=None, status=None, created_at=None):
+        """Index (or re-index) a single pipeline's output and script body"""
+        with self.conn:
+            self.delete_documents(pipeline_id)
+            rowids = {}
+            for kind, content in (("output", output), ("script", script)):
+                if content:
+                    cursor = self.conn.execute(
+                        "INSERT INTO documents (pipeline_id, kind, content) VALUES (?, ?, ?)",
+                        (pipeline_id, kind, content)
+                    )
+                    rowids[kind] = cursor.lastrowid
+            self.conn.execute(
+                """INSERT OR REPLACE INTO pipelines
+                   (pipeline_id, service, ticket, ref, status, created_at, indexed_at,
+                    output_rowid, script_rowid)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (pipeline_id, service, ticket, ref, status, created_at,
+                 datetime.now().isoformat(timespec='seconds'),
+                 rowids.get("output"), rowids.get("script"))
+            )
+
+    def build_match_query(self, query):
+        """Turn a user query into an FTS5 MATCH expression
+
+        Each whitespace separated term becomes a quoted token and each quoted
+        phrase stays a phrase, so IDs such as "ABC-123" never hit FTS syntax.
+        All terms must match.
+        """
+        try:
+            terms = shlex.split(query)
+        except ValueError:
+            terms = query.split()
+
+        return " ".join('"' + term.replace('"', '""') + '"' for term in terms if term)
+
+    def search(self, query, service=None, ticket=None, ref=None, kind=None,
+               since=None, until=None, limit=20):
+        """Return matching pipelines, best match first, with a highlighted snippet
+
+        Each pipeline appears once, with the snippet of its best matching
+        document, so limit counts pipelines rather than documents.
+        """
+        match_query = self.build_match_query(query)
+        if not match_query:
+            return []
+
+        clauses = []
+        params = [match_query]
+
+        if service:
+            clauses.append("p.service = ?")
+            params.append(service)
+        if ticket:
+            clauses.append("p.ticket = ?")
+            params.append(ticket)
+        if ref:
+            clauses.append("p.ref = ?")
+            params.append(ref)
+        if kind:
+            clauses.append("m.kind = ?")
+            params.append(kind)
+        if since:
+            clauses.append("substr(p.created_at, 1, 10) >= ?")
+            params.append(since)
+        if until:
+            clauses.append("substr(p.created_at, 1, 10) <= ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"""
+            SELECT pipeline_id, service, ticket, ref, status, created_at, kind, snippet
+            FROM (
+                SELECT p.pipeline_id, p.service, p.ticket, p.ref, p.status, p.created_at,
+                       m.kind, m.snippet, m.rank,
+                       ROW_NUMBER() OVER (PARTITION BY p.pipeline_id ORDER BY m.rank) AS best
+                FROM (
+                    SELECT pipeline_id, kind, snippet(documents, 2, '[', ']', '...', 12) AS snippet,
+                           bm25(documents) AS rank
+                    FROM documents
+                    WHERE documents MATCH ?
+                ) m
+                JOIN pipelines p ON p.pipeline_id = m.pipeline_id
+                {where}
+            )
+            WHERE best = 1
+            ORDER BY rank
+            LIMIT ?
+        """
+        params.append(limit)
+
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def count(self):
+        """Number of indexed pipelines"""
+        return self.conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]
+
+    def close(self):
+        """Close the index database"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,293 @@
+import codecs
+import csv
+import gzip
+import itertools
+import json
+import re
+import sys
+
+OUTPUT_START_MARKER = "---------------------OUTPUT CONTENT----------------------------"
+OUTPUT_END_MARKER = "---------------------END OF OUTPUT-----------------------------"
+
+# Number of lines looked at when guessing the format of the OUTPUT CONTENT section
+SAMPLE_SIZE = 20
+
+# Bytes requested per chunk when streaming a job trace
+TRACE_CHUNK_SIZE = 64 * 1024
+
+# Records per row group in the columnar output file
+COLUMNAR_GROUP_SIZE = 10000
+
+def iter_lines(chunks):
+    """Turn an iterable of byte/str chunks (e.g. a streamed job trace) into lines"""
+    # Incremental decoding keeps multi-byte characters split across chunks intact
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ""
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+def iter_output_content(lines):
+    """Yield only the lines between the OUTPUT CONTENT and END OF OUTPUT markers
+
+    Markers are matched like OUTPUT_CONTENT_PATTERN in pipeline_fetcher.py: the
+    start marker may follow other text on its line (e.g. an ANSI "\\x1b[0K"
+    prefix) and the end marker starts its line.
+    """
+    inside = False
+    for line in lines:
+        if not inside:
+            inside = line.rstrip().endswith(OUTPUT_START_MARKER)
+        elif line.startswith(OUTPUT_END_MARKER):
+            return
+        else:
+            yield line
+
+class RecordDetector:
+    """Base class for OUTPUT CONTENT formats; subclasses are tried in DETECTORS order"""
+
+    name = None
+
+    def matches(self, sample):
+        """Return True when the sampled non-empty lines look like this format"""
+        raise NotImplementedError
+
+    def parse(self, lines):
+        """Yield one dict per record from an iterator of lines"""
+        raise NotImplementedError
+
+class JsonLinesDetector(RecordDetector):
+    name = "jsonl"
+
+    def matches(self, sample):
+        try:
+            return all(isinstance(json.loads(line), dict) for line in sample)
+        except ValueError:
+            return False
+
+    def parse(self, lines):
+        """Lines that are not JSON objects (e.g. a trailing "Done in 3s") become text records"""
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else {"line": number, "text": line}
+
+class DelimitedDetector(RecordDetector):
+    """Header row followed by rows with the same number of delimited columns
+
+    To avoid mistaking prose with commas for a table, the sample needs at
+    least MIN_ROWS lines and a header of unique column names that either look
+    like identifiers (e.g. "contract_id", no surrounding spaces) or that
+    csv.Sniffer recognises as a header.
+    """
+
+    delimiter = None
+    MIN_ROWS = 3
+    column_name = re.compile(r'^[A-Za-z_][\w.\-]*$')
+
+    def matches(self, sample):
+        if len(sample) < self.MIN_ROWS:
+            return False
+
+        rows = list(csv.reader(sample, delimiter=self.delimiter))
+        widths = {len(row) for row in rows}
+        if len(widths) != 1 or widths.pop() < 2:
+            return False
+
+        header = rows[0]
+        if any(not name.strip() for name in header) or len(set(header)) != len(header):
+            return False
+        if all(self.column_name.match(name) for name in header):
+            return True
+
+        try:
+            return csv.Sniffer().has_header("\n".join(sample))
+        except csv.Error:
+            return False
+
+    def parse(self, lines):
+        reader = csv.reader((line for line in lines if line.strip()), delimiter=self.delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [column.strip() for column in header]
+        for row in reader:
+            yield dict(zip(header, (value.strip() for value in row)))
+
+class TsvDetector(DelimitedDetector):
+    name = "tsv"
+    delimiter = "\t"
+
+class CsvDetector(DelimitedDetector):
+    name = "csv"
+    delimiter = ","
+
+class KeyValueDetector(RecordDetector):
+    """`key: value` lines, one record per block separated by blank lines"""
+
+    name = "keyvalue"
+    pattern = re.compile(r'^\s*([A-Za-z0-9_ .\-]+?)\s*:\s+(.*)$')
+
+    def matches(self, sample):
+        return all(self.pattern.match(line) for line in sample)
+
+    def parse(self, lines):
+        record = {}
+        for line in lines:
+            match = self.pattern.match(line)
+            if match:
+                key, value = match.groups()
+                if key in record:
+                    # A repeated key starts a new record even without a blank line
+                    yield record
+                    record = {}
+                record[key] = value.strip()
+            elif not line.strip() and record:
+                yield record
+                record = {}
+        if record:
+            yield record
+
+class PlainTextDetector(RecordDetector):
+    """Fallback: one record per non-empty line"""
+
+    name = "text"
+
+    def matches(self, sample):
+        return True
+
+    def parse(self, lines):
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                yield {"line": number, "text": line}
+
+DETECTORS = [
+    JsonLinesDetector(),
+    TsvDetector(),
+    CsvDetector(),
+    KeyValueDetector(),
+    PlainTextDetector(),
+]
+
+def register_detector(detector, position=0):
+    """Add a custom detector; by default it is tried before the built-in ones"""
+    DETECTORS.insert(position, detector)
+
+def get_detector(name):
+    for detector in DETECTORS:
+        if detector.name == name:
+            return detector
+    raise ValueError(f"Unknown record format: {name}")
+
+def parse_records(lines, format_name=None):
+    """Detect the format of the OUTPUT CONTENT lines and stream them as records
+
+    Only the first SAMPLE_SIZE non-empty lines are buffered for detection;
+    they are replayed in front of the remaining lines before parsing.
+    Returns (format_name, records_iterator).
+    """
+    lines = iter(lines)
+
+    if format_name:
+        return format_name, get_detector(format_name).parse(lines)
+
+    head = []
+    sample = []
+    for line in lines:
+        head.append(line)
+        if line.strip():
+            sample.append(line)
+            if len(sample) >= SAMPLE_SIZE:
+                break
+
+    replayed = itertools.chain(head, lines)
+    for detector in DETECTORS:
+        if sample and detector.matches(sample):
+            return detector.name, detector.parse(replayed)
+
+    return PlainTextDetector.name, PlainTextDetector().parse(replayed)
+
+def write_jsonl(records, stream):
+    """Write records as JSON Lines; returns the number of records written"""
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+def write_csv(records, stream):
+    """Write records as CSV using the first record's keys as the header
+
+    Keys that only appear in later records are dropped, since the header has
+    already been written by the time they show up.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return 0
+
+    writer = csv.DictWriter(stream, fieldnames=list(first), extrasaction='ignore')
+    writer.writeheader()
+    writer.writerow(first)
+    count = 1
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+def write_columnar(records, path, group_size=COLUMNAR_GROUP_SIZE):
+    """Write records to a gzip file of column-oriented row groups
+
+    Each line of the file is one JSON row group: {"rows": n, "columns": {name: [values]}}.
+    At most group_size records are held in memory at a time.
+    """
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as stream:
+        records = iter(records)
+        while True:
+            group = list(itertools.islice(records, group_size))
+            if not group:
+                break
+
+            names = list(dict.fromkeys(key for record in group for key in record))
+            columns = {name: [record.get(name) for record in group] for name in names}
+            stream.write(json.dumps({"rows": len(group), "columns": columns}, ensure_ascii=False) + "\n")
+            count += len(group)
+    return count
+
+def iter_columnar(path):
+    """Stream records back out of a file written by write_columnar
+
+    Keys a record did not have come back as None when another record in the
+    same row group had them.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        for line in stream:
+            group = json.loads(line)
+            names = list(group["columns"])
+            for values in zip(*(group["columns"][name] for name in names)):
+                yield dict(zip(names, values))
+
+def export_records(records, output_format, path=None, stdout=None):
+    """Stream records to a file (or stdout) as jsonl, csv or columnar"""
+    if output_format == "columnar":
+        if not path:
+            raise ValueError("The columnar format needs an output path")
+        return write_columnar(records, path)
+
+    writer = write_jsonl if output_format == "jsonl" else write_csv
+    if path:
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            return writer(records, stream)
+    return writer(records, stdout or sys.stdout)
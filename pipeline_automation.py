@@ -3,11 +3,21 @@ import argparse
 import sys
 import re
 import os
+import json
+import tempfile
+from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.firefox.options import Options
+from request_scheduler import PRIORITY_ACTION, PRIORITY_FETCH, PRIORITY_POLL, scheduler
+from stage_history import DEFAULT_SCHEDULES, PollSchedule, StageHistory
+from pipeline_fetcher import GitlabPipelineFetcher
+from ref_catalog import RefCatalog
+
+# Job statuses that end a stage without success
+FAILED_JOB_STATUSES = ("failed", "canceled", "skipped")
 
 SCRIPTS_PATH = "/Users/mahadasif/Desktop/wareef-scripts"
 
@@ -15,7 +25,14 @@ class GitLabPipelineAutomator:
     def __init__(self):
         self.driver = None
         self.wait = None
+        # True when driving the user's own Chrome through debuggerAddress
+        self.attached = False
         self.pipeline_id = None
+        self.ejar_service = None
+        self.branch_name = None
+        self.stage_history = StageHistory()
+        self.fetcher = None
+        self.catalog = RefCatalog()
 
     def connect_to_existing_firefox(self):
         """Connect to Firefox - will reuse existing profile but may open new window"""
@@ -27,6 +44,7 @@ class GitLabPipelineAutomator:
 
             self.driver = webdriver.Firefox(options=options)
             self.wait = WebDriverWait(self.driver, 10)
+            self.attached = False
             print("Successfully connected to Firefox browser")
             return True
 
@@ -44,6 +62,7 @@ class GitLabPipelineAutomator:
 
             self.driver = webdriver.Chrome(options=chrome_options)
             self.wait = WebDriverWait(self.driver, 10)
+            self.attached = True
             print("Successfully connected to existing Chrome browser")
             return True
 
@@ -52,7 +71,79 @@ class GitLabPipelineAutomator:
             print("Please start Chrome with: /Applications/Google\\ Chrome.app/Contents/MacOS/Google\\ Chrome --remote-debugging-port=9222")
             return False
 
+    def start_headless_chrome(self):
+        """Start a new, isolated headless Chrome (used by browser pool workers)"""
+        try:
+            from selenium.webdriver.chrome.options import Options as ChromeOptions
+
+            chrome_options = ChromeOptions()
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--window-size=1920,1080")
+
+            self.driver = webdriver.Chrome(options=chrome_options)
+            self.wait = WebDriverWait(self.driver, 10)
+            self.attached = False
+            print("Successfully started headless Chrome browser")
+            return True
+
+        except Exception as e:
+            print(f"Could not start headless Chrome: {e}")
+            return False
+
+    def export_cookies(self, path):
+        """Save the GitLab session cookies of the connected browser to a JSON file"""
+        try:
+            scheduler.acquire(PRIORITY_FETCH)
+            self.driver.get(os.getenv('GITLAB_BASE_URL'))
+            cookies = self.driver.get_cookies()
+            # mkstemp creates the file owner-only (0600), so the cookies are never readable by others
+            file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                                          prefix='.cookies.', suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump(cookies, file)
+            os.replace(temp_path, path)
+            print(f"✓ Exported {len(cookies)} login cookie(s) to {path}")
+            return True
+
+        except Exception as e:
+            print(f"Error exporting cookies: {e}")
+            return False
+
+    def load_cookies(self, path):
+        """Log this browser in by adding cookies saved with export_cookies"""
+        try:
+            with open(path, 'r') as file:
+                cookies = json.load(file)
+
+            # Cookies can only be set for the domain that is currently open
+            scheduler.acquire(PRIORITY_FETCH)
+            self.driver.get(os.getenv('GITLAB_BASE_URL'))
+            for cookie in cookies:
+                cookie.pop('sameSite', None)
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception as e:
+                    print(f"⚠️ Skipping cookie {cookie.get('name')}: {e}")
+
+            print(f"✓ Loaded {len(cookies)} login cookie(s)")
+            return True
+
+        except Exception as e:
+            print(f"Error loading cookies: {e}")
+            return False
+
+    def is_healthy(self):
+        """Check that the browser session still responds"""
+        try:
+            return self.driver is not None and self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
     def reload_page(self):
+        # Reloads are status polling, so they yield to pipeline actions
+        scheduler.acquire(PRIORITY_POLL)
         try:
             self.driver.refresh()
             # Wait for page to be fully loaded before printing success
@@ -64,6 +155,7 @@ class GitLabPipelineAutomator:
             print(f"❌ Error while safe reload: {e}")
             # Fallback method
             try:
+                scheduler.acquire(PRIORITY_POLL)
                 self.driver.get(self.driver.current_url)
                 # Wait for fallback reload to complete
                 WebDriverWait(self.driver, 10).until(
@@ -74,6 +166,39 @@ class GitLabPipelineAutomator:
                 print(f"❌ Fallback reload also failed: {fallback_error}")
                 return False
 
+    def poll_schedule(self, stage):
+        """Build the polling schedule for a stage from past runs of this service and branch"""
+        try:
+            schedule = self.stage_history.schedule(self.ejar_service, self.branch_name, stage)
+        except Exception as e:
+            print(f"⚠️ Could not read stage history, using default schedule: {e}")
+            schedule = PollSchedule(stage, **DEFAULT_SCHEDULES[stage])
+
+        print(f"📅 Polling schedule - {schedule.describe()}")
+        return schedule
+
+    def record_stage(self, schedule, success, duration=None):
+        """Store how long a stage took so future runs poll around that time
+
+        duration defaults to the time spent polling, for callers that cannot
+        see the job's own timings.
+        """
+        if duration is None:
+            duration = schedule.elapsed()
+        try:
+            self.stage_history.record(self.ejar_service, self.branch_name, schedule.stage,
+                                      duration, success)
+            print(f"📈 Recorded {schedule.stage} stage duration: {duration:.0f}s after {schedule.polls} poll(s)")
+        except Exception as e:
+            print(f"⚠️ Could not record stage duration: {e}")
+
+    def wait_for_next_poll(self, schedule):
+        """Sleep until the schedule's next check, then reload the page"""
+        delay = schedule.next_delay()
+        print(f"⏳ Checking again in {delay:.0f}s ({schedule.describe()})")
+        time.sleep(delay)
+        self.reload_page()
+
     def navigate_to_gitlab_pipeline(self):
         """Navigate to the GitLab pipeline page"""
         base_url = os.getenv('GITLAB_BASE_URL')
@@ -83,6 +208,7 @@ class GitLabPipelineAutomator:
             current_url = self.driver.current_url
             if target_url not in current_url:
                 print(f"Navigating to: {target_url}")
+                scheduler.acquire(PRIORITY_FETCH)
                 self.driver.get(target_url)
 
                 # Wait for page to load
@@ -104,6 +230,7 @@ class GitLabPipelineAutomator:
             base_url = os.getenv('GITLAB_BASE_URL')
             pipeline_url = f"{base_url}/ejar3/devs/ejar3-run-script-tool/-/pipelines/new"
 
+            scheduler.acquire(PRIORITY_FETCH)
             self.driver.get(pipeline_url)
             self.reload_page()
             # Wait for the page to fully load by checking the presence of the fieldset
@@ -113,6 +240,7 @@ class GitLabPipelineAutomator:
 
             # Navigate directly to pipeline page (user already logged in)
             print("Navigating to GitLab pipeline page...")
+            scheduler.acquire(PRIORITY_FETCH)
             self.driver.get(pipeline_url)
 
             # Wait for the page to fully load by checking the presence of the fieldset
@@ -136,19 +264,16 @@ class GitLabPipelineAutomator:
             # Find the ul inside the parent div
             ul_element = base_dropdown_div.find_element(By.TAG_NAME, 'ul')
 
-            # Select the li element in order based on branch_name
-            if branch_name.lower() == "development":
-                index = 4
-            elif branch_name.lower() == "production":
-                index = 5
-            elif branch_name.lower() == "test":
-                index = 6
-            elif branch_name.lower() == "uat":
-                index = 7
-            else:
-                raise ValueError(f"Invalid branch name: {branch_name}")
+            # Select the li element whose text is the branch name (exact match first,
+            # then case-insensitive, so "-b Production" still selects "production")
+            ref_items = [(item, item.text.strip()) for item in ul_element.find_elements(By.TAG_NAME, 'li')]
+            selected_li_element = (
+                next((item for item, text in ref_items if text == branch_name), None)
+                or next((item for item, text in ref_items if text.lower() == branch_name.lower()), None)
+            )
+            if selected_li_element is None:
+                raise ValueError(f"Branch '{branch_name}' not found in ref dropdown")
 
-            selected_li_element = ul_element.find_elements(By.TAG_NAME, 'li')[index]
             selected_li_element.click()
             time.sleep(2)
 
@@ -240,22 +365,23 @@ class GitLabPipelineAutomator:
 
             listbox_ul = dropdown_div.find_element(By.ID, 'listbox-58')
 
-            # Find the service option that matches the provided ejar_service
-            service_options = listbox_ul.find_elements(By.TAG_NAME, 'li')
-            service_selected = False
+            # Keep the service catalog in sync with the options the form offers
+            if not self.catalog.is_fresh("services"):
+                self.catalog.update("services", [
+                    (option.get_attribute('data-testid') or '').replace('listbox-item-', '')
+                    for option in listbox_ul.find_elements(By.TAG_NAME, 'li')
+                ])
 
-            for option in service_options:
-                option_text = option.get_attribute('data-testid')
-                if option_text and ejar_service.lower() in option_text.lower():
-                    option.click()
-                    service_selected = True
-                    print(f"✓ Selected service: '{option_text.replace('listbox-item-', '')}'")
-                    break
+            # Select the service option directly by its value
+            service_options = listbox_ul.find_elements(
+                By.CSS_SELECTOR, f'li[data-testid="listbox-item-{ejar_service}"]'
+            )
+            if not service_options:
+                print(f"✗ Service '{ejar_service}' not found in service dropdown")
+                return False
 
-            if not service_selected:
-                print(f"✗ Service '{ejar_service}' not found, using default (5th option)")
-                fifth_ul_element = listbox_ul.find_elements(By.TAG_NAME, 'li')[4]
-                fifth_ul_element.click()
+            service_options[0].click()
+            print(f"✓ Selected service: '{ejar_service}'")
 
             time.sleep(1)
 
@@ -277,6 +403,7 @@ class GitLabPipelineAutomator:
             run_pipeline_button = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-testid="run-pipeline-button"]'))
             )
+            scheduler.acquire(PRIORITY_ACTION)
             run_pipeline_button.click()
 
             print("Successfully processed CI variables and started pipeline")
@@ -296,7 +423,8 @@ class GitLabPipelineAutomator:
             def pipeline_page_loaded(driver):
                 current_url = driver.current_url
                 print(f"Current URL: {current_url}")
-                return current_url.startswith(pipeline_path_prefix)
+                # The form itself lives at .../pipelines/new, so require a numeric ID
+                return re.match(re.escape(pipeline_path_prefix) + r'\d+', current_url) is not None
 
             # Wait up to 30 seconds for page navigation
             try:
@@ -314,6 +442,7 @@ class GitLabPipelineAutomator:
 
     def request_pipeline(self):
         try:
+            schedule = self.poll_schedule("request")
             print("Looking for request_prod badge...")
 
             try:
@@ -335,10 +464,9 @@ class GitLabPipelineAutomator:
 
             # Monitor request stage until completion
             print("Monitoring request stage completion...")
-            max_attempts = 10  # Maximum attempts to avoid infinite loop
             attempt = 0
 
-            while attempt < max_attempts:
+            while not schedule.expired():
                 try:
                     # Find the request badge again (in case page refreshed)
                     ci_badge_request_prod_div = WebDriverWait(self.driver, 10).until(
@@ -353,27 +481,24 @@ class GitLabPipelineAutomator:
 
                     if 'ci-icon-variant-success' in icon_class:
                         print("✓ Request stage completed successfully!")
+                        self.record_stage(schedule, success=True)
                         return True
                     elif 'ci-icon-variant-failed' in icon_class or 'ci-icon-variant-error' in icon_class:
                         print("✗ Request stage failed!")
+                        self.record_stage(schedule, success=False)
                         return False
                     else:
-                        print("⏳ Request stage still in progress so try reload page...")
-                        self.reload_page()
-
+                        print("⏳ Request stage still in progress...")
 
                 except Exception as e:
                     print(f"⚠️ Error checking request stage status: {e}")
-                    print("Refreshing page and retrying...")
-                    self.reload_page()
 
                 attempt += 1
-                if attempt < max_attempts:
-                  self.reload_page()
-                  print(f"⏳ Checking... (attempt {attempt}/{max_attempts})")
-                  time.sleep(5)
+                if not schedule.expired():
+                    self.wait_for_next_poll(schedule)
 
             print("⚠️ Request stage monitoring timed out")
+            self.record_stage(schedule, success=False)
             return False
 
         except Exception as e:
@@ -396,6 +521,7 @@ class GitLabPipelineAutomator:
                         approve_button = ci_badge_approve_prod_div.find_element(By.CSS_SELECTOR, '[data-testid="ci-action-button"]')
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", approve_button)
                         time.sleep(2)
+                        scheduler.acquire(PRIORITY_ACTION)
                         approve_button.click()
                         time.sleep(2)
 
@@ -409,12 +535,12 @@ class GitLabPipelineAutomator:
 
                         print("✓ Successfully clicked approve button")
 
-                        time.sleep(5)
-
+                        schedule = self.poll_schedule("approve")
                         print("⏳ Approve stage in progress...")
 
-                        attempt = 0
-                        while attempt < max_attempts:
+                        while not schedule.expired():
+                            self.wait_for_next_poll(schedule)
+
                             ci_badge_approve_prod_div = self.driver.find_element(By.ID, 'ci-badge-approve_prod')
                             ci_icon = ci_badge_approve_prod_div.find_element(By.CSS_SELECTOR, '[data-testid="ci-icon"]')
 
@@ -426,12 +552,14 @@ class GitLabPipelineAutomator:
 
                             if success_ci_icon:
                                 print("✓ Approve stage completed successfully!")
+                                self.record_stage(schedule, success=True)
                                 return True
                             else:
-                                print("✗ Approve stage still in progress so try reload page...")
-                                self.reload_page()
-                                print(f"⏳ Checking... (attempt {attempt}/{max_attempts})")
-                                time.sleep(5)
+                                print("✗ Approve stage still in progress...")
+
+                        print("⚠️ Approve stage monitoring timed out")
+                        self.record_stage(schedule, success=False)
+                        return False
 
                 except Exception as e:
                     pass
@@ -458,6 +586,7 @@ class GitLabPipelineAutomator:
               )
               print("✓ Found run pipeline badge")
 
+              scheduler.acquire(PRIORITY_ACTION)
               ci_badge_runscript_prod_div.click()
               print("✓ Redirected to pipeline execution page")
 
@@ -465,14 +594,13 @@ class GitLabPipelineAutomator:
             print(f"✗ Could not click run pipeline badge: {e}")
             return False
 
-        time.sleep(15)
+        schedule = self.poll_schedule("runscript")
+        time.sleep(schedule.next_delay())
 
         try:
           print("Monitor the pipeline execution until completion")
-          max_attempts = 60  # Maximum attempts (5 minutes with 5-second intervals)
-          attempt = 0
 
-          while attempt < max_attempts:
+          while not schedule.expired():
               try:
                   pipeline_info_div = self.driver.find_element(
                       By.CSS_SELECTOR,
@@ -489,24 +617,23 @@ class GitLabPipelineAutomator:
                   if aria_label and "Status: Passed" in aria_label:
                       self.pipeline_id = pipeline_info_div.find_element(By.CSS_SELECTOR, 'a[data-testid="pipeline-path"]').get_attribute('href').split('/')[-1]
                       print(f"Pipeline execution passed with pipeline_id: {self.pipeline_id}")
+                      self.record_stage(schedule, success=True)
                       return True
 
                   if aria_label and "Status: Failed" in aria_label:
                       print("Pipeline execution failed")
+                      self.record_stage(schedule, success=False)
                       return False
 
               except Exception as e:
                   print(f"✗ Could not find pipeline-status-link: {e}")
                   pass
 
-              attempt += 1
-
-              if attempt < max_attempts:
-                  self.reload_page()
-                  print(f"⏳ Checking... (attempt {attempt}/{max_attempts})")
-                  time.sleep(10)
+              if not schedule.expired():
+                  self.wait_for_next_poll(schedule)
 
           print("⚠️ Pipeline monitoring timed out")
+          self.record_stage(schedule, success=False)
           return False
 
         except Exception as e:
@@ -514,6 +641,117 @@ class GitLabPipelineAutomator:
           return False
 
 
+    def capture_pipeline_id(self, timeout=30):
+        """Read the new pipeline's ID from the browser URL (.../pipelines/<id>)
+
+        Waits for the browser to leave the .../pipelines/new form first.
+        """
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.url_matches(r'/pipelines/\d+'))
+        except Exception as e:
+            print(f"⚠️ Timeout waiting for the pipeline URL: {e}")
+
+        try:
+            match = re.search(r'/pipelines/(\d+)', self.driver.current_url)
+            if match:
+                self.pipeline_id = match.group(1)
+                print(f"✓ Captured pipeline_id: {self.pipeline_id}")
+                return self.pipeline_id
+        except Exception as e:
+            print(f"✗ Could not read pipeline URL: {e}")
+
+        print("✗ Pipeline ID not found in the current URL")
+        return None
+
+    def wait_for_job_status(self, job_name, schedule, target_statuses):
+        """Poll a job through the jobs API until it reaches one of target_statuses"""
+        while True:
+            try:
+                with scheduler.priority(PRIORITY_POLL):
+                    job = self.fetcher.get_pipeline_jobs(self.pipeline_id).get(job_name)
+                status = job.status if job else "not created"
+                print(f"{job_name}: {status} ({schedule.describe()})")
+
+                if job and status in target_statuses:
+                    return job
+                if status in FAILED_JOB_STATUSES:
+                    print(f"✗ Job {job_name} ended with status: {status}")
+                    return None
+
+            except Exception as e:
+                print(f"⚠️ Error checking {job_name} status: {e}")
+
+            if schedule.expired():
+                print(f"⚠️ {job_name} monitoring timed out")
+                return None
+
+            delay = schedule.next_delay()
+            print(f"⏳ Checking again in {delay:.0f}s")
+            time.sleep(delay)
+
+    def job_duration(self, job):
+        """Seconds a finished job spent queued and running, from its API timings"""
+        if job.duration is not None:
+            return job.duration + (getattr(job, 'queued_duration', None) or 0)
+        if job.started_at and job.finished_at:
+            started = datetime.fromisoformat(job.started_at.replace('Z', '+00:00'))
+            finished = datetime.fromisoformat(job.finished_at.replace('Z', '+00:00'))
+            return (finished - started).total_seconds()
+        return None
+
+    def execute_pipeline_via_api(self):
+        """Monitor and approve the created pipeline through the GitLab jobs API"""
+        try:
+            if self.fetcher is None:
+                self.fetcher = GitlabPipelineFetcher()
+
+            # Step 1: Request stage
+            schedule = self.poll_schedule("request")
+            request_job = self.wait_for_job_status("request_prod", schedule, ("success",))
+            if not request_job:
+                self.record_stage(schedule, success=False)
+                print("❌ Failed at request pipeline stage")
+                return False
+            self.record_stage(schedule, success=True, duration=self.job_duration(request_job))
+
+            # Step 2: Approval stage - play the manual approve job once it is available
+            ready = PollSchedule("approve", **DEFAULT_SCHEDULES["request"])
+            approve_job = self.wait_for_job_status("approve_prod", ready, ("manual", "success"))
+            if not approve_job:
+                print("❌ Approve job never became available")
+                return False
+
+            schedule = self.poll_schedule("approve")
+            if approve_job.status == "manual":
+                with scheduler.priority(PRIORITY_ACTION):
+                    self.fetcher.play_job(approve_job.id)
+                print("✓ Successfully triggered approve job")
+
+            approve_job = self.wait_for_job_status("approve_prod", schedule, ("success",))
+            if not approve_job:
+                self.record_stage(schedule, success=False)
+                print("❌ Failed at approval pipeline stage")
+                return False
+            self.record_stage(schedule, success=True, duration=self.job_duration(approve_job))
+
+            # Step 3: Run script stage
+            schedule = self.poll_schedule("runscript")
+            runscript_job = self.wait_for_job_status("runscript_prod", schedule, ("success",))
+            if not runscript_job:
+                self.record_stage(schedule, success=False)
+                print("❌ Failed at run pipeline stage")
+                return False
+            self.record_stage(schedule, success=True, duration=self.job_duration(runscript_job))
+
+            print(f"Pipeline execution passed with pipeline_id: {self.pipeline_id}")
+            print("=" * 60)
+            print("✅ Pipeline approval process completed successfully!")
+            return True
+
+        except Exception as e:
+            print(f"💥 Error monitoring pipeline via API: {e}")
+            return False
+
     def execute_pipeline(self):
         """Main pipeline approval orchestrator"""
         try:
@@ -553,38 +791,86 @@ class GitLabPipelineAutomator:
 
             return False
 
-    def run_automation(self, branch_name="production", ticket_description="", script="", ejar_service=""):
-        """Main automation function with refactored approval process"""
+    def preflight_check(self, branch_name, script, ejar_service):
+        """Validate inputs against the ref/service catalog before opening a browser"""
+        self.catalog.refresh_refs()
+
+        errors = self.catalog.validate(branch_name, ejar_service)
+        if not os.path.isfile(f"{SCRIPTS_PATH}/{script}.rb"):
+            errors.append(f"Script not found: {SCRIPTS_PATH}/{script}.rb")
+
+        for error in errors:
+            print(f"✗ {error}")
+        if not errors:
+            print("✓ Preflight check passed")
+        return not errors
+
+    def create_pipeline(self, branch_name, ticket_description, script, ejar_service):
+        """Fill in and submit the new pipeline form in the connected browser"""
+        self.ejar_service = ejar_service
+        self.branch_name = branch_name
+
+        # Navigate to GitLab pipeline page
+        if not self.navigate_to_gitlab_pipeline():
+            return False
+
+        # Select the branch
+        if not self.select_branch(branch_name):
+            return False
+
+        # Read the script
+        script_content = self.read_script(script)
+        if not script_content:
+            print("Error reading script")
+            return False
+
+        # Process CI variables with provided parameters
+        if not self.process_ci_variables(ticket_description, script_content, ejar_service):
+            print("Error processing CI variables")
+            return False
+
+        return True
+
+    def run_automation(self, branch_name="production", ticket_description="", script="", ejar_service="",
+                       monitor="browser"):
+        """Main automation function with refactored approval process
+
+        monitor="api" detaches from the browser as soon as the pipeline is created
+        and follows the remaining stages through the GitLab jobs API.
+        """
         try:
             # Validate required parameters
             if not ticket_description or not script or not ejar_service:
                 print("Error: All parameters (ticket_description, script, ejar_service) are required")
                 return False
 
+            # Stage polling schedules are learned per service and branch
+            self.ejar_service = ejar_service
+            self.branch_name = branch_name
+
+            # Fail fast on unknown branch/service/script, before any browser work
+            if not self.preflight_check(branch_name, script, ejar_service):
+                return False
+
             # Try to connect to existing Chrome first, then Firefox
             if not self.connect_to_existing_chrome():
                 if not self.connect_to_existing_firefox():
                     print("Could not connect to any existing browser")
                     return False
 
-            # Navigate to GitLab pipeline page
-            if not self.navigate_to_gitlab_pipeline():
-                return False
-
-            # Select the branch
-            if not self.select_branch(branch_name):
-                return False
-
-            # Read the script
-            script_content = self.read_script(script)
-            if not script_content:
-                print("Error reading script")
+            if not self.create_pipeline(branch_name, ticket_description, script, ejar_service):
                 return False
 
-            # Process CI variables with provided parameters
-            if not self.process_ci_variables(ticket_description, script_content, ejar_service):
-                print("Error processing CI variables")
-                return False
+            if monitor == "api":
+                # Hybrid mode: the browser is only needed to create the pipeline
+                self.wait_for_pipeline_page()
+                if self.capture_pipeline_id():
+                    self.release_browser()
+                    if not self.execute_pipeline_via_api():
+                        print("Error executing pipeline")
+                        return False
+                    return True
+                print("⚠️ Falling back to browser monitoring")
 
             # Use the refactored approval process
             if not self.execute_pipeline():
@@ -597,12 +883,24 @@ class GitLabPipelineAutomator:
             print(f"Error in automation: {e}")
             return False
 
+    def release_browser(self):
+        """Stop using the browser: detach from the user's Chrome, quit one we started"""
+        if self.driver and not self.attached:
+            print("Closing browser...")
+            self.driver.quit()
+        self.driver = None
+        self.wait = None
+
     def close(self):
         """Close the browser connection"""
         if self.driver:
             print("Closing browser...")
             self.driver.quit()
             self.driver = None
+        if self.stage_history:
+            self.stage_history.close()
+            self.stage_history = None
+        print(scheduler.format_metrics())
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -654,6 +952,13 @@ Available Ejar Services:
         help='Git branch to use (default: production)'
     )
 
+    parser.add_argument(
+        '-m', '--monitor',
+        choices=['browser', 'api'],
+        default='browser',
+        help='How to follow the pipeline after creation: "api" detaches from the browser and uses the jobs API (default: browser)'
+    )
+
     return parser.parse_args()
 
 # Usage
@@ -672,6 +977,7 @@ if __name__ == "__main__":
     print(f"Script: {args.script}")
     print(f"Ejar Service: {args.ejar_service}")
     print(f"Branch: {args.branch}")
+    print(f"Monitor: {args.monitor}")
 
     # Special note for sec services
     if "sec" in args.ejar_service.lower():
@@ -686,7 +992,8 @@ if __name__ == "__main__":
             branch_name=args.branch,
             ticket_description=args.ticket,
             script=args.script,
-            ejar_service=args.ejar_service
+            ejar_service=args.ejar_service,
+            monitor=args.monitor
         )
 
         if success:
@@ -1,20 +1,32 @@
 import os
+import sys
 import gitlab
 import argparse
 import re
 from dotenv import load_dotenv
 from datetime import datetime
+from output_index import INDEX_PATH, PipelineOutputIndex
+from artifact_downloader import ArtifactDownloader
+from pipeline_stats import (DEFAULT_BACKFILL_LIMIT, METRICS, PERCENTILES, STATS_PATH, PipelineStatsStore,
+                            refresh_stats)
+from request_scheduler import ScheduledSession, scheduler
+from output_parser import DETECTORS, TRACE_CHUNK_SIZE, export_records, iter_lines, iter_output_content, parse_records
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Pattern to match the OUTPUT CONTENT section
+OUTPUT_CONTENT_PATTERN = r'---------------------OUTPUT CONTENT----------------------------\n(.*?)\n---------------------END OF OUTPUT-----------------------------'
+
 class GitlabPipelineFetcher:
     """Simple GitLab pipeline fetcher by ID"""
 
     def __init__(self):
         self.gl = gitlab.Gitlab(
             url = os.getenv('GITLAB_BASE_URL'),
-            private_token=os.getenv('GITLAB_ACCESS_TOKEN')
+            private_token=os.getenv('GITLAB_ACCESS_TOKEN'),
+            # Every API call goes through the shared rate-limit-aware scheduler
+            session=ScheduledSession(scheduler)
         )
         self.gl.auth()
         self.project = self.gl.projects.get(os.getenv('PROJECT_ID'))
@@ -51,10 +63,7 @@ class GitlabPipelineFetcher:
 
     def extract_output_content(self, logs):
         """Extract only the OUTPUT CONTENT section from logs"""
-        # Pattern to match the OUTPUT CONTENT section
-        output_pattern = r'---------------------OUTPUT CONTENT----------------------------\n(.*?)\n---------------------END OF OUTPUT-----------------------------'
-
-        match = re.search(output_pattern, logs, re.DOTALL)
+        match = re.search(OUTPUT_CONTENT_PATTERN, logs, re.DOTALL)
         if match:
             return match.group(1).strip()
         else:
@@ -147,6 +156,161 @@ class GitlabPipelineFetcher:
             print(f"Error retrieving script output: {e}")
             return False
 
+    def export_output_records(self, pipeline_id, output_format="jsonl", path=None,
+                              record_format=None, job_name="runscript_prod"):
+        """Stream the OUTPUT CONTENT section of a job trace out as structured records
+
+        The trace is read chunk by chunk and records are written as they are
+        parsed, so outputs with millions of rows never sit in memory at once.
+        """
+        try:
+            pipeline = self.project.pipelines.get(pipeline_id)
+            total = 0
+
+            for job in pipeline.jobs.list(get_all=True):
+                if job_name and job.name != job_name:
+                    continue
+
+                full_job = self.project.jobs.get(job.id)
+                chunks = full_job.trace(streamed=True, iterator=True, chunk_size=TRACE_CHUNK_SIZE)
+                lines = iter_output_content(iter_lines(chunks))
+                detected, records = parse_records(lines, record_format)
+
+                count = export_records(records, output_format, path=path)
+                total += count
+                print(f"✓ Job {job.name}: {count} {detected} record(s) written as {output_format}"
+                      f"{f' to {path}' if path else ''}", file=sys.stderr)
+
+            return total
+
+        except gitlab.exceptions.GitlabGetError:
+            print(f"Pipeline {pipeline_id} not found", file=sys.stderr)
+            return None
+        except Exception as e:
+            print(f"Error exporting script output records: {e}", file=sys.stderr)
+            return None
+
+    def get_pipeline_jobs(self, pipeline_id):
+        """Return the pipeline's latest jobs keyed by job name"""
+        pipeline = self.project.pipelines.get(pipeline_id, lazy=True)
+        return {job.name: job for job in pipeline.jobs.list(get_all=True)}
+
+    def play_job(self, job_id):
+        """Trigger a manual job (same as clicking its play button)"""
+        self.project.jobs.get(job_id, lazy=True).play()
+
+    def get_pipeline_variables(self, pipeline):
+        """Map the pipeline's CI variables onto ticket, service and script"""
+        variables = {"ticket": None, "service": None, "script": None}
+
+        try:
+            for variable in pipeline.variables.list(get_all=True):
+                key = variable.key.upper()
+                if "TICKET" in key:
+                    variables["ticket"] = variable.value
+                elif "SERVICE" in key:
+                    variables["service"] = variable.value
+                elif "SCRIPT" in key:
+                    variables["script"] = variable.value
+        except Exception as e:
+            print(f"Could not retrieve variables for pipeline {pipeline.id}: {e}")
+
+        return variables
+
+    def index_pipeline(self, index, pipeline_id, job_name="runscript_prod"):
+        """Fetch one pipeline's OUTPUT CONTENT and script body into the local index"""
+        try:
+            pipeline = self.project.pipelines.get(pipeline_id)
+            jobs = [job for job in pipeline.jobs.list(get_all=True) if job.name == job_name]
+            if not jobs:
+                print(f"Pipeline {pipeline_id} has no {job_name} job, not indexed")
+                return False
+
+            variables = self.get_pipeline_variables(pipeline)
+
+            output_sections = []
+            for job in jobs:
+                logs = self.project.jobs.get(job.id).trace().decode('utf-8')
+                match = re.search(OUTPUT_CONTENT_PATTERN, logs, re.DOTALL)
+                if match:
+                    output_sections.append(match.group(1).strip())
+
+            index.add_pipeline(
+                pipeline.id,
+                output="\n".join(output_sections),
+                script=variables["script"] or "",
+                service=variables["service"],
+                ticket=variables["ticket"],
+                ref=pipeline.ref,
+                status=pipeline.status,
+                created_at=pipeline.created_at
+            )
+            print(f"✓ Indexed pipeline {pipeline.id} [{variables['service']}] {variables['ticket']}")
+            return True
+
+        except gitlab.exceptions.GitlabGetError:
+            print(f"Pipeline {pipeline_id} not found")
+            return False
+        except Exception as e:
+            print(f"Error indexing pipeline {pipeline_id}: {e}")
+            return False
+
+    def index_pipelines(self, index, pipeline_ids=None, limit=100, reindex=False, job_name="runscript_prod"):
+        """Incrementally index the given pipelines, or up to limit new ones with a finished job_name job
+
+        Without pipeline IDs the project's jobs are paged newest first, so only
+        pipelines that ran job_name are considered, until limit unindexed
+        pipelines are found or the job-ID watermark of the last complete scan
+        is reached. The watermark only advances when a scan reaches it; jobs
+        still running (or failing to index) keep it below them.
+        """
+        if pipeline_ids:
+            indexed = 0
+            for pipeline_id in pipeline_ids:
+                if not reindex and index.is_indexed(pipeline_id):
+                    continue
+                if self.index_pipeline(index, pipeline_id, job_name):
+                    indexed += 1
+            print(f"\n📚 Indexed {indexed} new pipeline(s), {index.count()} in index")
+            return indexed
+
+        watermark = index.watermark()
+        new_watermark = None
+        candidates = {}
+        complete = True
+
+        for job in self.project.jobs.list(per_page=100, iterator=True):
+            if job.id <= watermark:
+                break
+            if new_watermark is None:
+                new_watermark = job.id
+            pipeline_id = job.pipeline['id']
+            if job.name != job_name or pipeline_id in candidates:
+                continue
+
+            if job.status not in ('success', 'failed', 'canceled'):
+                new_watermark = min(new_watermark, job.id - 1)
+                continue
+            if not reindex and index.is_indexed(pipeline_id):
+                continue
+            if len(candidates) >= limit:
+                complete = False
+                break
+            candidates[pipeline_id] = job.id
+
+        indexed = 0
+        for pipeline_id, job_id in candidates.items():
+            if self.index_pipeline(index, pipeline_id, job_name):
+                indexed += 1
+            elif new_watermark is not None:
+                new_watermark = min(new_watermark, job_id - 1)
+
+        if complete and new_watermark is not None:
+            index.set_watermark(max(watermark, new_watermark))
+
+        print(f"\n📚 Indexed {indexed} new pipeline(s), {index.count()} in index")
+        return indexed
+
     def run(self, pipeline_id, output_only=False):
         """Run the script with command line argument pipeline_id"""
         self.get_pipeline_by_id(pipeline_id)
@@ -158,17 +322,161 @@ class GitlabPipelineFetcher:
             # Get full script output (original behavior)
             self.get_full_script_output(pipeline_id, job_name="runscript_prod")
 
+def search_index(args):
+    """Answer a search query from the local index without any API calls"""
+    index = PipelineOutputIndex(args.index_path)
+    try:
+        results = index.search(
+            args.query,
+            service=args.service,
+            ticket=args.ticket,
+            ref=args.ref,
+            kind=args.kind,
+            since=args.since,
+            until=args.until,
+            limit=args.limit
+        )
+
+        print(f"\n🔎 {len(results)} match(es) for {args.query!r}")
+        print("=" * 60)
+        for result in results:
+            print(f"Pipeline {result['pipeline_id']} | {result['service']} | {result['ticket']} | "
+                  f"{result['ref']} | {result['created_at']} | {result['kind']}")
+            print(f"    {result['snippet']}")
+        return results
+    finally:
+        index.close()
+
+def print_stats_report(args):
+    """Refresh the local stats store above its watermark and print the report"""
+    store = PipelineStatsStore(args.stats_path)
+    try:
+        if not args.offline:
+            refresh_stats(GitlabPipelineFetcher(), store, workers=args.workers, since=args.since, limit=args.limit)
+
+        filters = {"since": args.since, "service": args.service, "ref": args.ref}
+
+        print("\n📊 Failure rate per service and branch")
+        print("=" * 60)
+        for row in store.failure_rates(**filters):
+            print(f"{row['service']} | {row['ref']} | {row['failed']}/{row['finished']} failed "
+                  f"({row['failure_rate']}%), {row['canceled']} canceled")
+
+        for metric in args.metrics or list(METRICS):
+            print(f"\n⏱️  {metric} (seconds)")
+            print("=" * 60)
+            for row in store.percentiles(metric, **filters):
+                percentiles = " ".join(f"p{q}={row[f'p{q}']:.1f}" for q in PERCENTILES)
+                print(f"{row['service']} | {row['ref']} | n={row['count']} mean={row['mean']:.1f} "
+                      f"{percentiles} max={row['max']:.1f}")
+
+            if args.histogram:
+                for row in store.histogram(metric, args.bucket, **filters):
+                    print(f"    {row['service']} | {row['ref']} | {row['bucket']:>6.0f}s+ | "
+                          f"{'#' * min(row['count'], 60)} {row['count']}")
+    finally:
+        store.close()
+
 if __name__ == "__main__":
     """
     Example commands:
     python3 pipeline_fetcher.py --pipeline-id 12345                    # Full output (original)
     python3 pipeline_fetcher.py --pipeline-id 12345 --output-only      # Only OUTPUT CONTENT section
+    python3 pipeline_fetcher.py index --limit 500                      # Index latest finished pipelines
+    python3 pipeline_fetcher.py search "4821937" --service ejar3-core-app
+    python3 pipeline_fetcher.py search '"contract not found"' --since 2025-01-01
+    python3 pipeline_fetcher.py records 12345 > rows.jsonl            # OUTPUT CONTENT as JSON Lines
+    python3 pipeline_fetcher.py records 12345 --format columnar --out rows.col.gz
+    python3 pipeline_fetcher.py artifacts 12345 12346 --member 'output/*.csv' --dest ./artifacts
+    python3 pipeline_fetcher.py stats --since 2025-01-01 --histogram   # Incremental refresh + report
     """
     parser = argparse.ArgumentParser(description='GitLab pipeline fetcher')
-    parser.add_argument('--pipeline-id', type=int, required=True, help='Pipeline ID')
+    parser.add_argument('--pipeline-id', type=int, help='Pipeline ID')
     parser.add_argument('--output-only', action='store_true', help='Extract only the OUTPUT CONTENT section')
+    parser.add_argument('--index-path', default=INDEX_PATH, help=f'Local search index (default: {INDEX_PATH})')
+    parser.add_argument('--scheduler-stats', action='store_true', help='Print request scheduler metrics when done')
+
+    subparsers = parser.add_subparsers(dest='command')
+
+    index_parser = subparsers.add_parser('index', help='Add pipeline outputs and scripts to the local search index')
+    index_parser.add_argument('--pipeline-ids', type=int, nargs='+', help='Pipeline IDs to index (default: new pipelines with a finished runscript_prod job)')
+    index_parser.add_argument('--limit', type=int, default=100, help='Maximum number of new pipelines to index per run (default: 100)')
+    index_parser.add_argument('--reindex', action='store_true', help='Re-fetch pipelines that are already indexed')
+
+    search_parser = subparsers.add_parser('search', help='Search indexed outputs and scripts (no API calls)')
+    search_parser.add_argument('query', help='Tokens to match; wrap a phrase in quotes, e.g. \'"contract not found"\'')
+    search_parser.add_argument('--service', help='Only pipelines for this ejar3 service')
+    search_parser.add_argument('--ticket', help='Only pipelines for this ticket')
+    search_parser.add_argument('--ref', help='Only pipelines on this branch')
+    search_parser.add_argument('--kind', choices=['output', 'script'], help='Only search script output or script bodies')
+    search_parser.add_argument('--since', help='Only pipelines created on or after this date (YYYY-MM-DD)')
+    search_parser.add_argument('--until', help='Only pipelines created on or before this date (YYYY-MM-DD)')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum number of matches (default: 20)')
+
+    records_parser = subparsers.add_parser('records', help='Stream the OUTPUT CONTENT section as structured records')
+    records_parser.add_argument('pipeline_id', type=int, help='Pipeline ID')
+    records_parser.add_argument('--format', dest='output_format', choices=['jsonl', 'csv', 'columnar'], default='jsonl',
+                                help='Output format (default: jsonl)')
+    records_parser.add_argument('--parser', choices=[detector.name for detector in DETECTORS],
+                                help='Record format of the output (default: auto-detect)')
+    records_parser.add_argument('--out', help='Output file (default: stdout; required for columnar)')
+    records_parser.add_argument('--job-name', default='runscript_prod', help='Job to read (default: runscript_prod)')
+
+    artifacts_parser = subparsers.add_parser('artifacts', help='Download job artifact archives and extract chosen members')
+    artifacts_parser.add_argument('pipeline_ids', type=int, nargs='+', help='Pipeline IDs')
+    artifacts_parser.add_argument('--job-name', default='runscript_prod', help='Job whose artifacts to fetch (default: runscript_prod)')
+    artifacts_parser.add_argument('--member', action='append', help='Archive path or glob to extract (repeatable)')
+    artifacts_parser.add_argument('--extract', action='store_true', help='Extract every member of the archive')
+    artifacts_parser.add_argument('--dest', default='artifacts', help='Directory for extracted members (default: ./artifacts)')
+    artifacts_parser.add_argument('--workers', type=int, default=4, help='Pipelines downloaded concurrently (default: 4)')
+
+    stats_parser = subparsers.add_parser('stats', help='Refresh the local timing store and report pipeline trends')
+    stats_parser.add_argument('--stats-path', default=STATS_PATH, help=f'Local stats store (default: {STATS_PATH})')
+    stats_parser.add_argument('--offline', action='store_true', help='Report from the local store without fetching')
+    stats_parser.add_argument('--metric', dest='metrics', action='append', choices=list(METRICS),
+                              help='Metric to report (repeatable, default: all)')
+    stats_parser.add_argument('--since', help='Only pipelines created on or after this date (YYYY-MM-DD); also where a backfill starts')
+    stats_parser.add_argument('--service', help='Only this ejar3 service')
+    stats_parser.add_argument('--ref', help='Only this branch')
+    stats_parser.add_argument('--histogram', action='store_true', help='Also print histograms')
+    stats_parser.add_argument('--bucket', type=float, default=60, help='Histogram bucket width in seconds (default: 60)')
+    stats_parser.add_argument('--workers', type=int, default=4, help='Pipelines fetched concurrently (default: 4)')
+    stats_parser.add_argument('--limit', type=int, default=DEFAULT_BACKFILL_LIMIT,
+                              help=f'Maximum pipelines fetched per run (default: {DEFAULT_BACKFILL_LIMIT})')
 
     args = parser.parse_args()
 
-    fetcher = GitlabPipelineFetcher()
-    fetcher.run(args.pipeline_id, output_only=args.output_only)
\ No newline at end of file
+    if args.command == 'stats':
+        print_stats_report(args)
+    elif args.command == 'artifacts':
+        fetcher = GitlabPipelineFetcher()
+        downloader = ArtifactDownloader(fetcher)
+        patterns = args.member or ([] if args.extract else None)
+        results = downloader.fetch_pipelines(args.pipeline_ids, args.dest, job_name=args.job_name,
+                                             patterns=patterns, workers=args.workers)
+        if any(paths is None for paths in results.values()):
+            sys.exit(1)
+    elif args.command == 'records':
+        if args.output_format == 'columnar' and not args.out:
+            parser.error('--out is required for the columnar format')
+        fetcher = GitlabPipelineFetcher()
+        if fetcher.export_output_records(args.pipeline_id, output_format=args.output_format, path=args.out,
+                                         record_format=args.parser, job_name=args.job_name) is None:
+            sys.exit(1)
+    elif args.command == 'search':
+        search_index(args)
+    elif args.command == 'index':
+        fetcher = GitlabPipelineFetcher()
+        index = PipelineOutputIndex(args.index_path)
+        try:
+            fetcher.index_pipelines(index, pipeline_ids=args.pipeline_ids, limit=args.limit, reindex=args.reindex)
+        finally:
+            index.close()
+    elif args.pipeline_id is None:
+        parser.error('--pipeline-id is required unless a command is given')
+    else:
+        fetcher = GitlabPipelineFetcher()
+        fetcher.run(args.pipeline_id, output_only=args.output_only)
+
+    if args.scheduler_stats:
+        print(scheduler.format_metrics(), file=sys.stderr)
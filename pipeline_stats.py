@@ -0,0 +1,306 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+
+STATS_PATH = os.getenv(
+    'PIPELINE_STATS_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/pipeline_stats.db')
+)
+
+# Unfinished (or failing to fetch) pipelines newer than this hold the watermark
+# back so they are fetched again on the next refresh; older ones are given up on
+UNFINISHED_GRACE_DAYS = 2
+
+FINISHED_STATUSES = ("success", "failed", "canceled", "skipped")
+
+# Pipelines listed and stored per page; the watermark advances after each page
+PAGE_SIZE = 100
+
+# Pipelines fetched per refresh, so a first backfill is spread over several runs
+DEFAULT_BACKFILL_LIMIT = 2000
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Each metric yields one (service, ref, created_at, value) row per pipeline, in seconds
+METRICS = {
+    "queue_time": """
+        SELECT p.service, p.ref, p.created_at, j.queued_duration AS value
+        FROM pipelines p JOIN jobs j ON j.pipeline_id = p.pipeline_id AND j.name = 'request_prod'
+    """,
+    "request_to_approve": """
+        SELECT p.service, p.ref, p.created_at,
+               (julianday(a.started_at) - julianday(r.finished_at)) * 86400 AS value
+        FROM pipelines p
+        JOIN jobs r ON r.pipeline_id = p.pipeline_id AND r.name = 'request_prod'
+        JOIN jobs a ON a.pipeline_id = p.pipeline_id AND a.name = 'approve_prod'
+    """,
+    "runscript_duration": """
+        SELECT p.service, p.ref, p.created_at, j.duration AS value
+        FROM pipelines p JOIN jobs j ON j.pipeline_id = p.pipeline_id AND j.name = 'runscript_prod'
+        WHERE j.status = 'success'
+    """,
+    "pipeline_duration": """
+        SELECT p.service, p.ref, p.created_at,
+               (julianday(p.finished_at) - julianday(p.created_at)) * 86400 AS value
+        FROM pipelines p
+        WHERE p.status = 'success'
+    """,
+}
+
+class PipelineStatsStore:
+    """Local store of pipeline/job timing rows with an incremental pipeline-ID watermark
+
+    Aggregations run inside SQLite (window functions and GROUP BY over the
+    whole table), so reports stay fast with hundreds of thousands of rows.
+    """
+
+    def __init__(self, path=STATS_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pipelines (
+                pipeline_id INTEGER PRIMARY KEY,
+                service TEXT,
+                ref TEXT,
+                status TEXT,
+                created_at TEXT,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY,
+                pipeline_id INTEGER,
+                name TEXT,
+                stage TEXT,
+                status TEXT,
+                created_at TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                queued_duration REAL,
+                duration REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_pipeline_name ON jobs (pipeline_id, name);
+            CREATE INDEX IF NOT EXISTS pipelines_service_ref ON pipelines (service, ref);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def watermark(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        return int(row[0]) if row else 0
+
+    def resume_after(self):
+        """Creation time at or before that of every pipeline above the watermark"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'resume_after'").fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, pipeline_id, resume_after=None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (str(pipeline_id),)
+            )
+            if resume_after:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('resume_after', ?)", (resume_after,)
+                )
+
+    def add_pipeline(self, pipeline_row, job_rows):
+        """Insert or replace one pipeline and its jobs, dropping jobs no longer listed"""
+        with self.conn:
+            # Retried jobs get new IDs, so stale rows would otherwise join twice
+            self.conn.execute("DELETE FROM jobs WHERE pipeline_id = ?", (pipeline_row["pipeline_id"],))
+            self.conn.execute(
+                """INSERT OR REPLACE INTO pipelines
+                   (pipeline_id, service, ref, status, created_at, finished_at)
+                   VALUES (:pipeline_id, :service, :ref, :status, :created_at, :finished_at)""",
+                pipeline_row
+            )
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO jobs
+                   (job_id, pipeline_id, name, stage, status, created_at, started_at,
+                    finished_at, queued_duration, duration)
+                   VALUES (:job_id, :pipeline_id, :name, :stage, :status, :created_at,
+                           :started_at, :finished_at, :queued_duration, :duration)""",
+                job_rows
+            )
+
+    def filters(self, since=None, service=None, ref=None):
+        """WHERE clause and parameters shared by all reports"""
+        clauses = ["value IS NOT NULL"]
+        params = []
+        if since:
+            clauses.append("substr(created_at, 1, 10) >= ?")
+            params.append(since)
+        if service:
+            clauses.append("service = ?")
+            params.append(service)
+        if ref:
+            clauses.append("ref = ?")
+            params.append(ref)
+        return " AND ".join(clauses), params
+
+    def rows(self, sql, params):
+        cursor = self.conn.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def percentiles(self, metric, since=None, service=None, ref=None):
+        """Nearest-rank percentiles, mean and max of a metric per service and ref"""
+        where, params = self.filters(since, service, ref)
+        percentile_columns = ", ".join(
+            f"MIN(CASE WHEN rn >= {q / 100} * n THEN value END) AS p{q}" for q in PERCENTILES
+        )
+        sql = f"""
+            WITH ranked AS (
+                SELECT service, ref, value,
+                       ROW_NUMBER() OVER (PARTITION BY service, ref ORDER BY value) AS rn,
+                       COUNT(*) OVER (PARTITION BY service, ref) AS n
+                FROM ({METRICS[metric]})
+                WHERE {where}
+            )
+            SELECT service, ref, MAX(n) AS count, AVG(value) AS mean, {percentile_columns}, MAX(value) AS max
+            FROM ranked
+            GROUP BY service, ref
+            ORDER BY service, ref
+        """
+        return self.rows(sql, params)
+
+    def histogram(self, metric, bucket_seconds, since=None, service=None, ref=None):
+        """Counts of a metric in fixed-width buckets per service and ref"""
+        where, params = self.filters(since, service, ref)
+        sql = f"""
+            SELECT service, ref, CAST(value / ? AS INTEGER) * ? AS bucket, COUNT(*) AS count
+            FROM ({METRICS[metric]})
+            WHERE {where}
+            GROUP BY service, ref, bucket
+            ORDER BY service, ref, bucket
+        """
+        return self.rows(sql, [bucket_seconds, bucket_seconds] + params)
+
+    def failure_rates(self, since=None, service=None, ref=None):
+        """Finished, failed and canceled pipeline counts per service and ref"""
+        where, params = self.filters(since, service, ref)
+        statuses = ", ".join(f"'{status}'" for status in FINISHED_STATUSES)
+        sql = f"""
+            SELECT service, ref, COUNT(*) AS finished,
+                   SUM(status = 'failed') AS failed,
+                   SUM(status = 'canceled') AS canceled,
+                   ROUND(100.0 * SUM(status = 'failed') / COUNT(*), 1) AS failure_rate
+            FROM (SELECT service, ref, status, created_at, 1 AS value FROM pipelines)
+            WHERE {where} AND status IN ({statuses})
+            GROUP BY service, ref
+            ORDER BY service, ref
+        """
+        return self.rows(sql, params)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+def pipeline_timing_rows(fetcher, pipeline):
+    """Build the stored rows for one pipeline (variables and jobs cost two API calls)"""
+    variables = fetcher.get_pipeline_variables(pipeline)
+    jobs = pipeline.jobs.list(get_all=True)
+
+    finished_at = max((job.finished_at for job in jobs if job.finished_at), default=None)
+    pipeline_row = {
+        "pipeline_id": pipeline.id,
+        "service": variables["service"],
+        "ref": pipeline.ref,
+        "status": pipeline.status,
+        "created_at": pipeline.created_at,
+        "finished_at": finished_at,
+    }
+    job_rows = [
+        {
+            "job_id": job.id,
+            "pipeline_id": pipeline.id,
+            "name": job.name,
+            "stage": job.stage,
+            "status": job.status,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "queued_duration": getattr(job, 'queued_duration', None),
+            "duration": job.duration,
+        }
+        for job in jobs
+    ]
+    return pipeline_row, job_rows
+
+def refresh_stats(fetcher, store, workers=4, since=None, limit=DEFAULT_BACKFILL_LIMIT):
+    """Fetch up to limit pipelines above the watermark into the store, oldest first
+
+    Pipelines are listed in ascending ID order, bounded below by
+    updated_after (the later of since and the creation time saved with the
+    watermark), and stored a page at a time with the watermark saved after
+    every page, so an interrupted or limited backfill resumes where it
+    stopped. The first recent pipeline that is unfinished or could not be
+    fetched holds the watermark below it, so a later refresh retries it;
+    past UNFINISHED_GRACE_DAYS it is skipped instead of blocking the backfill.
+    """
+    watermark = store.watermark()
+    grace_cutoff = (datetime.now(timezone.utc) - timedelta(days=UNFINISHED_GRACE_DAYS)).isoformat()
+    updated_after = max(filter(None, (since, store.resume_after())), default=None)
+
+    list_options = {"order_by": 'id', "sort": 'asc', "per_page": PAGE_SIZE, "iterator": True}
+    if updated_after:
+        list_options["updated_after"] = updated_after
+    pipelines = islice(
+        (pipeline for pipeline in fetcher.project.pipelines.list(**list_options) if pipeline.id > watermark),
+        limit
+    )
+
+    def fetch(pipeline):
+        try:
+            return pipeline_timing_rows(fetcher, pipeline)
+        except Exception as e:
+            print(f"⚠️ Could not fetch timings for pipeline {pipeline.id}: {e}")
+            return None
+
+    print(f"⬇️  Fetching timings for pipelines above watermark {watermark}"
+          f"{f' updated after {updated_after}' if updated_after else ''}...")
+
+    listed = 0
+    stored = 0
+    held = None
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while True:
+            page = list(islice(pipelines, PAGE_SIZE))
+            if not page:
+                break
+            listed += len(page)
+
+            for pipeline, rows in zip(page, executor.map(fetch, page)):
+                if rows is not None:
+                    store.add_pipeline(*rows)
+                    stored += 1
+
+                recent = pipeline.created_at >= grace_cutoff
+                if rows is None and not recent:
+                    print(f"⚠️ Skipping pipeline {pipeline.id}: still failing after {UNFINISHED_GRACE_DAYS} days")
+
+                unfinished = pipeline.status not in FINISHED_STATUSES
+                if held is None and recent and (rows is None or unfinished):
+                    held = pipeline
+                    store.set_watermark(pipeline.id - 1, pipeline.created_at)
+                    reason = "could not be fetched" if rows is None else f"is {pipeline.status}"
+                    print(f"⏸️  Pipeline {pipeline.id} {reason}; holding the watermark at {pipeline.id - 1}")
+                elif held is None:
+                    store.set_watermark(pipeline.id, pipeline.created_at)
+
+            print(f"  ... {stored} pipeline(s) stored, watermark {store.watermark()}")
+
+    if listed >= limit:
+        print(f"ℹ️  Stopped after --limit {limit} pipelines; run again to continue the backfill")
+    print(f"✓ Stored {stored} pipeline(s), watermark {store.watermark()}, {store.count()} in store")
+    return stored
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+import time
+
+CATALOG_PATH = os.getenv(
+    'REF_CATALOG_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/ref_catalog.json')
+)
+
+# Seconds before cached refs/services are fetched again
+CATALOG_TTL = int(os.getenv('REF_CATALOG_TTL', str(24 * 60 * 60)))
+
+# Used until the catalog has been filled from the API or the pipeline form
+DEFAULT_REFS = ["development", "production", "test", "uat"]
+DEFAULT_SERVICES = [
+    "ejar3-frontend",
+    "ejar3-core-app",
+    "ejar3-sidekiq",
+    "ejar3-cockpit",
+    "ejar3-ads-service",
+    "ejar3-agreement",
+    "ejar3-auth-service",
+    "ejar3-contract",
+    "ejar3-search-service",
+    "ejar3-security-deposit",
+    "ejar3-sec",
+]
+
+class RefCatalog:
+    """Locally cached list of valid refs and ejar3 services for preflight checks
+
+    Refs come from the branches API, services from the service dropdown of
+    the pipeline form (recorded whenever the form is filled). Each list has
+    its own timestamp and is refreshed once it is older than the TTL.
+    """
+
+    def __init__(self, path=CATALOG_PATH, ttl=CATALOG_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.data = {"refs": [], "refs_fetched_at": 0, "services": [], "services_fetched_at": 0}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as file:
+                self.data.update(json.load(file))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not read ref catalog, starting empty: {e}")
+
+    def save(self):
+        """Write the catalog atomically, so concurrent readers never see a partial file"""
+        temp_path = None
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.ref_catalog.',
+                                             suffix='.tmp', delete=False) as file:
+                temp_path = file.name
+                json.dump(self.data, file, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save ref catalog: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def is_fresh(self, kind):
+        return bool(self.data[kind]) and time.time() - self.data[f"{kind}_fetched_at"] < self.ttl
+
+    def update(self, kind, values):
+        """Replace the cached refs or services and reset their TTL"""
+        values = sorted(set(value for value in values if value))
+        if not values:
+            return
+        self.data[kind] = values
+        self.data[f"{kind}_fetched_at"] = time.time()
+        self.save()
+
+    def refresh_refs(self, fetcher_factory=None, force=False):
+        """Fetch branch names from the API if the cached refs are stale"""
+        if self.is_fresh("refs") and not force:
+            return
+        if not os.getenv('GITLAB_ACCESS_TOKEN'):
+            return
+
+        try:
+            if fetcher_factory is None:
+                from pipeline_fetcher import GitlabPipelineFetcher
+                fetcher_factory = GitlabPipelineFetcher
+            fetcher = fetcher_factory()
+            branches = fetcher.project.branches.list(get_all=True)
+            self.update("refs", [branch.name for branch in branches])
+            print(f"✓ Refreshed ref catalog ({len(self.data['refs'])} refs)")
+        except Exception as e:
+            print(f"⚠️ Could not refresh refs from the API, using cached list: {e}")
+
+    def refs(self):
+        return self.data["refs"] or DEFAULT_REFS
+
+    def services(self):
+        return self.data["services"] or DEFAULT_SERVICES
+
+    def resolve_ref(self, branch_name):
+        """Catalog spelling of a branch, matched case-insensitively like the old
+        fixed branch list (an exact match wins); None when unknown"""
+        refs = self.refs()
+        if branch_name in refs:
+            return branch_name
+        lowered = (branch_name or "").lower()
+        return next((ref for ref in refs if ref.lower() == lowered), None)
+
+    def validate(self, branch_name, ejar_service):
+        """Return a list of problems with a branch/service pair (empty when valid)"""
+        errors = []
+        if self.resolve_ref(branch_name) is None:
+            errors.append(f"Unknown branch '{branch_name}' (valid: {', '.join(self.refs())})")
+        if ejar_service not in self.services():
+            errors.append(f"Unknown ejar service '{ejar_service}' (valid: {', '.join(self.services())})")
+        return errors
+
+    def validate_entries(self, entries):
+        """Validate many {"branch", "ejar_service"} entries; returns {index: [errors]}"""
+        problems = {}
+        for index, entry in enumerate(entries):
+            errors = self.validate(entry.get("branch", "production"), entry.get("ejar_service"))
+            if errors:
+                problems[index] = errors
+        return problems
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+# Lower number = served first when requests are queued behind the rate limit
+PRIORITY_ACTION = 0   # Calls that move a pipeline forward: trigger, approve, run
+PRIORITY_FETCH = 1    # One-off reads: navigation, pipeline/job details, traces
+PRIORITY_POLL = 2     # Repeated status checks and page reloads
+
+PRIORITY_NAMES = {
+    PRIORITY_ACTION: "action",
+    PRIORITY_FETCH: "fetch",
+    PRIORITY_POLL: "poll",
+}
+
+# Requests per second and burst size when the server has not told us otherwise
+DEFAULT_RATE = float(os.getenv('GITLAB_RATE_LIMIT', '5'))
+DEFAULT_BURST = int(os.getenv('GITLAB_RATE_BURST', '10'))
+
+# Stop spending below this many remaining requests until RateLimit-Reset
+RESERVE_REQUESTS = int(os.getenv('GITLAB_RATE_RESERVE', '5'))
+
+class RequestScheduler:
+    """Token bucket shared by every GitLab API call and browser page load
+
+    Callers block in acquire() until a token is available. While requests
+    are queued, the one with the lowest priority number is served first
+    (FIFO within a priority), so approve/trigger calls overtake polling.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, reserve=RESERVE_REQUESTS):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.local = threading.local()
+
+        self.stats = {
+            "requests": {name: 0 for name in PRIORITY_NAMES.values()},
+            "throttled": 0,
+            "throttle_seconds": 0.0,
+            "max_queue_depth": 0,
+            "rate_limit_pauses": 0,
+            "last_remaining": None,
+        }
+
+    def refill(self, now):
+        """Add the tokens earned since the last refill"""
+        elapsed = now - self.updated_at
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def next_available_in(self, now):
+        """Seconds until a token can be handed out"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, priority=None):
+        """Block until this request may be sent"""
+        if priority is None:
+            priority = getattr(self.local, "priority", PRIORITY_FETCH)
+
+        ticket = (priority, next(self.sequence))
+        started = time.monotonic()
+
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self.waiting))
+
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                delay = self.next_available_in(now)
+
+                if self.waiting[0] == ticket and delay <= 0:
+                    heapq.heappop(self.waiting)
+                    self.tokens -= 1
+                    break
+
+                # Only the head of the queue needs to wake up for the next token
+                self.condition.wait(timeout=delay if self.waiting[0] == ticket and delay > 0 else None)
+
+            self.condition.notify_all()
+
+            waited = time.monotonic() - started
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            self.stats["requests"][name] = self.stats["requests"].get(name, 0) + 1
+            if waited > 0.01:
+                self.stats["throttled"] += 1
+                self.stats["throttle_seconds"] += waited
+
+    @contextmanager
+    def priority(self, priority):
+        """Run the enclosed calls of the current thread at the given priority"""
+        previous = getattr(self.local, "priority", None)
+        self.local.priority = priority
+        try:
+            yield
+        finally:
+            self.local.priority = previous
+
+    def update_from_headers(self, headers):
+        """Adapt the bucket to GitLab's RateLimit-Remaining / RateLimit-Reset headers"""
+        remaining = headers.get('RateLimit-Remaining')
+        reset = headers.get('RateLimit-Reset')
+        if remaining is None:
+            return
+
+        try:
+            remaining = int(remaining)
+            reset_in = max(0.0, float(reset) - time.time()) if reset else 0.0
+        except ValueError:
+            return
+
+        with self.condition:
+            self.stats["last_remaining"] = remaining
+            now = time.monotonic()
+            self.refill(now)
+
+            if remaining <= self.reserve and reset_in > 0:
+                # Nearly out of budget: hold everything until the window resets
+                self.paused_until = max(self.paused_until, now + reset_in)
+                self.tokens = 0
+                self.stats["rate_limit_pauses"] += 1
+            elif reset_in > 0:
+                # Never hand out more tokens than the server will accept in this window
+                self.tokens = min(self.tokens, remaining - self.reserve)
+
+            self.condition.notify_all()
+
+    def queue_depth(self):
+        with self.condition:
+            return len(self.waiting)
+
+    def metrics(self):
+        """Snapshot of queue depth and throttling counters"""
+        with self.condition:
+            snapshot = dict(self.stats)
+            snapshot["requests"] = dict(self.stats["requests"])
+            snapshot["queue_depth"] = len(self.waiting)
+            snapshot["paused_for"] = max(0.0, self.paused_until - time.monotonic())
+            return snapshot
+
+    def format_metrics(self):
+        metrics = self.metrics()
+        requests_by_priority = ", ".join(f"{name}={count}" for name, count in metrics["requests"].items())
+        return (f"📊 Requests: {requests_by_priority} | throttled: {metrics['throttled']} "
+                f"({metrics['throttle_seconds']:.1f}s) | queue depth: {metrics['queue_depth']} "
+                f"(max {metrics['max_queue_depth']}) | rate-limit pauses: {metrics['rate_limit_pauses']} "
+                f"| last remaining: {metrics['last_remaining']}")
+
+class ScheduledSession(requests.Session):
+    """requests.Session that routes every call through a RequestScheduler
+
+    Writes (POST/PUT/DELETE) default to action priority and reads to fetch
+    priority, unless the calling thread is inside scheduler.priority(...).
+    """
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def request(self, method, url, *args, **kwargs):
+        priority = getattr(self.scheduler.local, "priority", None)
+        if priority is None:
+            priority = PRIORITY_FETCH if method.upper() in ("GET", "HEAD") else PRIORITY_ACTION
+
+        self.scheduler.acquire(priority)
+        response = super().request(method, url, *args, **kwargs)
+        self.scheduler.update_from_headers(response.headers)
+        return response
+
+scheduler = RequestScheduler()
@@ -0,0 +1,144 @@
+import math
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+HISTORY_PATH = os.getenv(
+    'STAGE_HISTORY_PATH',
+    os.path.expanduser('~/.gitlab_automation_tool/stage_history.db')
+)
+
+# Observed durations needed before the history replaces the defaults
+MIN_SAMPLES = 5
+
+# Only the most recent runs are used, so the schedule follows current behaviour
+RECENT_SAMPLES = 200
+
+# Deadline = DEADLINE_PERCENTILE of past durations * DEADLINE_MARGIN
+DEADLINE_PERCENTILE = 95
+DEADLINE_MARGIN = 1.5
+
+# Fallback schedule per stage (seconds), matching the old fixed attempt caps:
+# request 10 x 5 s, approve 20 x 5 s, runscript 15 s + 60 x 10 s
+DEFAULT_SCHEDULES = {
+    "request": {"expected": 25, "deadline": 50, "min_interval": 3, "max_interval": 15},
+    "approve": {"expected": 50, "deadline": 100, "min_interval": 3, "max_interval": 20},
+    "runscript": {"expected": 300, "deadline": 615, "min_interval": 5, "max_interval": 60},
+}
+
+def percentile(values, q):
+    """Linear-interpolated percentile of a list of numbers (q in 0..100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class PollSchedule:
+    """Decides how long to sleep between status checks of one stage
+
+    Polls rarely while the stage is far from its expected duration, halving
+    the gap as the expected completion approaches, then backs off slowly
+    once it is overdue. expired() replaces the old fixed attempt caps.
+    """
+
+    def __init__(self, stage, expected, deadline, min_interval, max_interval, samples=0):
+        self.stage = stage
+        self.expected = expected
+        self.deadline = deadline
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.samples = samples
+        self.started = time.monotonic()
+        self.polls = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def expired(self):
+        return self.elapsed() >= self.deadline
+
+    def next_delay(self):
+        """Seconds to sleep before the next status check"""
+        elapsed = self.elapsed()
+        until_expected = self.expected - elapsed
+
+        if until_expected > 0:
+            delay = until_expected / 2
+        else:
+            delay = -until_expected / 4
+
+        delay = max(self.min_interval, min(self.max_interval, delay))
+        delay = min(delay, max(0.0, self.deadline - elapsed))
+        self.polls += 1
+        return delay
+
+    def describe(self):
+        source = f"{self.samples} past runs" if self.samples else "defaults"
+        return (f"{self.stage}: {self.elapsed():.0f}s elapsed, expected ~{self.expected:.0f}s, "
+                f"deadline {self.deadline:.0f}s ({source})")
+
+class StageHistory:
+    """Local store of observed stage durations per service and branch"""
+
+    def __init__(self, path=HISTORY_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS stage_durations (
+                service TEXT,
+                branch TEXT,
+                stage TEXT,
+                duration REAL,
+                success INTEGER,
+                recorded_at TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS stage_durations_lookup
+            ON stage_durations (service, branch, stage, success)
+        """)
+        self.conn.commit()
+
+    def record(self, service, branch, stage, duration, success=True):
+        """Store one observed stage duration"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO stage_durations VALUES (?, ?, ?, ?, ?, ?)",
+                (service, branch, stage, duration, int(success),
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def durations(self, service, branch, stage, limit=RECENT_SAMPLES):
+        """Most recent successful durations for a service/branch/stage"""
+        rows = self.conn.execute(
+            """SELECT duration FROM stage_durations
+               WHERE service = ? AND branch = ? AND stage = ? AND success = 1
+               ORDER BY rowid DESC LIMIT ?""",
+            (service, branch, stage, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def schedule(self, service, branch, stage):
+        """Build a PollSchedule from history, falling back to the stage defaults"""
+        defaults = DEFAULT_SCHEDULES[stage]
+        durations = self.durations(service, branch, stage)
+
+        if len(durations) < MIN_SAMPLES:
+            return PollSchedule(stage, defaults["expected"], defaults["deadline"],
+                                defaults["min_interval"], defaults["max_interval"])
+
+        expected = percentile(durations, 50)
+        deadline = max(percentile(durations, DEADLINE_PERCENTILE) * DEADLINE_MARGIN,
+                       expected + defaults["max_interval"])
+        return PollSchedule(stage, expected, deadline, defaults["min_interval"],
+                            defaults["max_interval"], samples=len(durations))
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
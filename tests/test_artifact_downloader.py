@@ -0,0 +1,43 @@
+import zipfile
+
+from artifact_downloader import ArtifactDownloader
+
+def make_archive(path, members):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return str(path)
+
+def test_extract_members_filters_by_glob(tmp_path):
+    archive = make_archive(tmp_path / "artifacts.zip", {
+        "output/result.csv": "a,b\n1,2\n",
+        "output/log.txt": "done",
+        "report.json": "{}",
+    })
+    destination = tmp_path / "out"
+
+    extracted = ArtifactDownloader(None, str(tmp_path / "cache")).extract_members(
+        archive, str(destination), ["output/*.csv", "report.json"]
+    )
+
+    assert sorted(extracted) == sorted([str(destination / "output/result.csv"), str(destination / "report.json")])
+    assert (destination / "output/result.csv").read_text() == "a,b\n1,2\n"
+    assert not (destination / "output/log.txt").exists()
+
+def test_extract_members_without_patterns_extracts_everything(tmp_path):
+    archive = make_archive(tmp_path / "artifacts.zip", {"a.txt": "a", "dir/b.txt": "b"})
+    extracted = ArtifactDownloader(None, str(tmp_path / "cache")).extract_members(archive, str(tmp_path / "out"))
+    assert len(extracted) == 2
+
+def test_extract_members_skips_paths_outside_destination(tmp_path):
+    archive = make_archive(tmp_path / "artifacts.zip", {
+        "../escape.txt": "x",
+        "/absolute.txt": "y",
+        "safe.txt": "z",
+    })
+    destination = tmp_path / "out"
+
+    extracted = ArtifactDownloader(None, str(tmp_path / "cache")).extract_members(archive, str(destination))
+
+    assert extracted == [str(destination / "safe.txt")]
+    assert not (tmp_path / "escape.txt").exists()
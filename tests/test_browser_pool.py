@@ -0,0 +1,69 @@
+import queue
+import time
+
+import browser_pool
+from pipeline_automation import GitLabPipelineAutomator
+from request_scheduler import scheduler
+
+BASE_URL = "https://gitlab.example.com"
+FORM_URL = f"{BASE_URL}/ejar3/devs/ejar3-run-script-tool/-/pipelines/new"
+
+class DelayedRedirectDriver:
+    """Stays on the pipeline form for a moment after submit, like GitLab does"""
+
+    def __init__(self, pipeline_id, delay):
+        self.pipeline_id = pipeline_id
+        self.delay = delay
+        self.submitted_at = None
+
+    @property
+    def current_url(self):
+        if self.submitted_at is None or time.monotonic() - self.submitted_at < self.delay:
+            return FORM_URL
+        return FORM_URL.replace("/new", f"/{self.pipeline_id}")
+
+    def quit(self):
+        pass
+
+class FakeAutomator(GitLabPipelineAutomator):
+    def __init__(self):
+        self.driver = None
+        self.wait = None
+        self.pipeline_id = None
+        self.stage_history = None
+
+    def start_headless_chrome(self):
+        self.driver = DelayedRedirectDriver(123, delay=1.0)
+        return True
+
+    def load_cookies(self, path):
+        return True
+
+    def is_healthy(self):
+        return True
+
+    def create_pipeline(self, branch_name, ticket, script, ejar_service):
+        self.driver.submitted_at = time.monotonic()
+        return True
+
+def test_worker_waits_for_redirect_before_capturing_pipeline_id(monkeypatch):
+    monkeypatch.setenv("GITLAB_BASE_URL", BASE_URL)
+    monkeypatch.setattr(browser_pool, "GitLabPipelineAutomator", FakeAutomator)
+    for attribute in ("rate", "burst", "tokens"):
+        monkeypatch.setattr(scheduler, attribute, getattr(scheduler, attribute))
+
+    task_queue = queue.Queue()
+    result_queue = queue.Queue()
+    task_queue.put((0, {"ticket": "ES-1", "script": "check", "ejar_service": "ejar3-sec"}))
+    task_queue.put((None, None))
+    config = {"rate": 5, "burst": 10, "cookies_path": "cookies.json",
+              "max_runs": 5, "max_memory_growth_mb": 500}
+
+    browser_pool.worker_main(0, task_queue, result_queue, config)
+
+    messages = []
+    while not result_queue.empty():
+        messages.append(result_queue.get())
+    results = [message for message in messages if message[0] == "result"]
+    assert [result[2:4] for result in results] == [(0, "123")]
+    assert messages[-1][0] == "retired"
@@ -0,0 +1,44 @@
+from output_index import PipelineOutputIndex
+
+def build_index():
+    index = PipelineOutputIndex(':memory:')
+    index.add_pipeline(1, output="contract 4821937 not found", script="Contract.find(4821937)",
+                       service="ejar3-core-app", ticket="ES-1", ref="production",
+                       created_at="2025-01-10T08:00:00.000Z")
+    index.add_pipeline(2, output="contract 555 updated", script="Contract.update(555)",
+                       service="ejar3-sec", ticket="ES-2", ref="uat",
+                       created_at="2025-02-10T08:00:00.000Z")
+    return index
+
+def test_build_match_query_quotes_terms_and_keeps_phrases():
+    index = PipelineOutputIndex(':memory:')
+    assert index.build_match_query('ABC-123 "not found"') == '"ABC-123" "not found"'
+    assert index.build_match_query('say "hi') == '"say" """hi"'
+    assert index.build_match_query("   ") == ""
+
+def test_search_matches_all_terms():
+    index = build_index()
+    assert [row["pipeline_id"] for row in index.search("contract 555")] == [2]
+    assert index.search("ABC-123") == []
+
+def test_search_filters():
+    index = build_index()
+    assert [row["pipeline_id"] for row in index.search("contract", service="ejar3-sec")] == [2]
+    assert [row["pipeline_id"] for row in index.search("contract", ticket="ES-1")] == [1]
+    assert [row["pipeline_id"] for row in index.search("contract", ref="production")] == [1]
+    assert [row["pipeline_id"] for row in index.search("contract", since="2025-02-01")] == [2]
+    assert [row["pipeline_id"] for row in index.search("contract", until="2025-01-10")] == [1]
+    assert {row["kind"] for row in index.search("4821937", kind="script")} == {"script"}
+
+def test_search_returns_each_pipeline_once():
+    index = build_index()
+    rows = index.search("4821937")
+    assert [row["pipeline_id"] for row in rows] == [1]
+    assert len(index.search("contract", limit=2)) == 2
+
+def test_reindex_replaces_documents():
+    index = build_index()
+    index.add_pipeline(1, output="retried output")
+    assert index.search("4821937") == []
+    assert [row["pipeline_id"] for row in index.search("retried")] == [1]
+    assert index.count() == 2
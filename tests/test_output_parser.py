@@ -0,0 +1,99 @@
+import io
+
+from output_parser import (
+    OUTPUT_END_MARKER,
+    OUTPUT_START_MARKER,
+    iter_columnar,
+    iter_lines,
+    iter_output_content,
+    parse_records,
+    write_columnar,
+    write_csv,
+    write_jsonl,
+)
+
+def test_iter_lines_joins_lines_across_chunks():
+    assert list(iter_lines(["first\nsec", "ond\r\nthi", "rd"])) == ["first", "second", "third"]
+
+def test_iter_lines_keeps_multibyte_characters_split_across_chunks():
+    data = "name: عقد\n".encode('utf-8')
+    for split in range(len(data)):
+        assert list(iter_lines([data[:split], data[split:]])) == ["name: عقد"]
+
+def test_iter_output_content_accepts_prefixed_start_marker():
+    lines = ["setup", "\x1b[0K" + OUTPUT_START_MARKER, "a: 1", OUTPUT_END_MARKER, "cleanup"]
+    assert list(iter_output_content(lines)) == ["a: 1"]
+
+def test_iter_output_content_without_markers_yields_nothing():
+    assert list(iter_output_content(["a", "b"])) == []
+
+def test_detects_csv_with_header():
+    name, records = parse_records(["contract_id,status", "1,active", "2,closed"])
+    assert name == "csv"
+    assert list(records) == [{"contract_id": "1", "status": "active"},
+                             {"contract_id": "2", "status": "closed"}]
+
+def test_detects_tsv():
+    name, records = parse_records(["id\tname", "1\tAli", "2\tOmar"])
+    assert name == "tsv"
+    assert list(records)[1] == {"id": "2", "name": "Omar"}
+
+def test_prose_with_commas_is_not_csv():
+    assert parse_records(["Done, 5 rows", "Hello, world"])[0] == "text"
+    assert parse_records(["Done, 5 rows", "Hello, world", "Bye, all"])[0] == "text"
+
+def test_detects_json_lines():
+    name, records = parse_records(['{"a": 1}', '', '{"a": 2}'])
+    assert name == "jsonl"
+    assert list(records) == [{"a": 1}, {"a": 2}]
+
+def test_json_lines_keep_going_past_a_non_json_line():
+    lines = [f'{{"id": {i}}}' for i in range(30)] + ["Done in 3s", "[1, 2]"]
+    name, records = parse_records(iter(lines))
+    assert name == "jsonl"
+    records = list(records)
+    assert len(records) == 32
+    assert records[30] == {"line": 31, "text": "Done in 3s"}
+    assert records[31] == {"line": 32, "text": "[1, 2]"}
+
+    stream = io.StringIO()
+    assert write_csv(iter(records), stream) == 32
+
+def test_detects_key_value_blocks():
+    name, records = parse_records(["id: 1", "name: x", "", "id: 2", "name: y"])
+    assert name == "keyvalue"
+    assert list(records) == [{"id": "1", "name": "x"}, {"id": "2", "name": "y"}]
+
+def test_detection_replays_sampled_lines():
+    lines = ["id,value"] + [f"{i},{i * 2}" for i in range(100)]
+    name, records = parse_records(iter(lines))
+    assert name == "csv"
+    assert len(list(records)) == 100
+
+def test_forced_format_skips_detection():
+    name, records = parse_records(["a,b", "1,2"], "text")
+    assert name == "text"
+    assert [record["text"] for record in records] == ["a,b", "1,2"]
+
+def test_write_jsonl_and_csv():
+    records = [{"a": "1", "b": "x"}, {"a": "2", "b": "y", "extra": "dropped"}]
+
+    stream = io.StringIO()
+    assert write_jsonl(iter(records), stream) == 2
+    assert stream.getvalue().splitlines()[0] == '{"a": "1", "b": "x"}'
+
+    stream = io.StringIO()
+    assert write_csv(iter(records), stream) == 2
+    assert stream.getvalue().splitlines() == ["a,b", "1,x", "2,y"]
+
+def test_columnar_round_trip(tmp_path):
+    path = tmp_path / "rows.col.gz"
+    records = [{"id": i, "name": f"user {i}"} for i in range(25)] + [{"id": 25, "extra": "عقد"}]
+
+    assert write_columnar(iter(records), path, group_size=10) == 26
+
+    restored = list(iter_columnar(path))
+    assert restored[:20] == records[:20]
+    # Keys missing from a record come back as None within its row group
+    assert restored[20] == {"id": 20, "name": "user 20", "extra": None}
+    assert restored[25] == {"id": 25, "name": None, "extra": "عقد"}
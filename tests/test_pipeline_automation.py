@@ -0,0 +1,45 @@
+import os
+import stat
+
+from pipeline_automation import GitLabPipelineAutomator
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def get(self, url):
+        pass
+
+    def get_cookies(self):
+        return [{"name": "_gitlab_session", "value": "secret"}]
+
+    def quit(self):
+        self.quit_calls += 1
+
+def automator_with(driver, attached):
+    automator = GitLabPipelineAutomator.__new__(GitLabPipelineAutomator)
+    automator.driver = driver
+    automator.wait = None
+    automator.attached = attached
+    return automator
+
+def test_release_browser_detaches_from_users_chrome():
+    driver = FakeDriver()
+    automator = automator_with(driver, attached=True)
+    automator.release_browser()
+    assert driver.quit_calls == 0
+    assert automator.driver is None
+
+def test_release_browser_quits_browser_it_started():
+    driver = FakeDriver()
+    automator = automator_with(driver, attached=False)
+    automator.release_browser()
+    assert driver.quit_calls == 1
+    assert automator.driver is None
+
+def test_export_cookies_writes_owner_only_file(tmp_path):
+    path = tmp_path / "cookies.json"
+    automator = automator_with(FakeDriver(), attached=True)
+    assert automator.export_cookies(str(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert os.listdir(tmp_path) == ["cookies.json"]
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+from pipeline_stats import PipelineStatsStore, refresh_stats
+
+def add(store, pipeline_id, service, status, runscript_duration, ref="production"):
+    store.add_pipeline(
+        {"pipeline_id": pipeline_id, "service": service, "ref": ref, "status": status,
+         "created_at": "2025-03-01T10:00:00.000Z", "finished_at": "2025-03-01T10:05:00.000Z"},
+        [
+            {"job_id": pipeline_id * 10, "pipeline_id": pipeline_id, "name": "request_prod",
+             "stage": "request", "status": "success", "created_at": None,
+             "started_at": "2025-03-01T10:00:00.000Z", "finished_at": "2025-03-01T10:00:10.000Z",
+             "queued_duration": 2.0, "duration": 10.0},
+            {"job_id": pipeline_id * 10 + 1, "pipeline_id": pipeline_id, "name": "approve_prod",
+             "stage": "approve", "status": "success", "created_at": None,
+             "started_at": "2025-03-01T10:00:40.000Z", "finished_at": "2025-03-01T10:00:50.000Z",
+             "queued_duration": 1.0, "duration": 10.0},
+            {"job_id": pipeline_id * 10 + 2, "pipeline_id": pipeline_id, "name": "runscript_prod",
+             "stage": "run", "status": status, "created_at": None,
+             "started_at": None, "finished_at": None,
+             "queued_duration": 1.0, "duration": runscript_duration},
+        ]
+    )
+
+def test_percentiles_per_service():
+    store = PipelineStatsStore(':memory:')
+    for pipeline_id in range(1, 101):
+        add(store, pipeline_id, "ejar3-sec", "success", float(pipeline_id))
+    add(store, 101, "ejar3-core-app", "success", 7.0)
+
+    rows = {row["service"]: row for row in store.percentiles("runscript_duration")}
+    assert rows["ejar3-sec"]["count"] == 100
+    assert rows["ejar3-sec"]["p50"] == 50
+    assert rows["ejar3-sec"]["p95"] == 95
+    assert rows["ejar3-sec"]["max"] == 100
+    assert rows["ejar3-core-app"]["p99"] == 7
+
+def test_request_to_approve_latency():
+    store = PipelineStatsStore(':memory:')
+    add(store, 1, "ejar3-sec", "success", 5.0)
+    [row] = store.percentiles("request_to_approve")
+    assert round(row["p50"]) == 30
+
+def test_failure_rates_and_filters():
+    store = PipelineStatsStore(':memory:')
+    add(store, 1, "ejar3-sec", "success", 5.0)
+    add(store, 2, "ejar3-sec", "failed", 5.0)
+    add(store, 3, "ejar3-sec", "failed", 5.0, ref="uat")
+
+    [row] = store.failure_rates(ref="production")
+    assert (row["finished"], row["failed"], row["failure_rate"]) == (2, 1, 50.0)
+    assert store.failure_rates(since="2026-01-01") == []
+
+def test_histogram_buckets():
+    store = PipelineStatsStore(':memory:')
+    for pipeline_id, duration in enumerate((5.0, 30.0, 65.0, 70.0), start=1):
+        add(store, pipeline_id, "ejar3-sec", "success", duration)
+
+    rows = store.histogram("runscript_duration", 60)
+    assert [(row["bucket"], row["count"]) for row in rows] == [(0, 2), (60, 2)]
+
+def test_refetched_pipeline_replaces_retried_jobs():
+    store = PipelineStatsStore(':memory:')
+    pipeline_row = {"pipeline_id": 1, "service": "ejar3-sec", "ref": "production", "status": "success",
+                    "created_at": "2025-03-01T10:00:00.000Z", "finished_at": None}
+
+    def runscript_job(job_id, duration):
+        return {"job_id": job_id, "pipeline_id": 1, "name": "runscript_prod", "stage": "run",
+                "status": "success", "created_at": None, "started_at": None, "finished_at": None,
+                "queued_duration": 0.0, "duration": duration}
+
+    store.add_pipeline(pipeline_row, [runscript_job(10, 50.0)])
+    store.add_pipeline(pipeline_row, [runscript_job(11, 70.0)])
+
+    [row] = store.percentiles("runscript_duration")
+    assert row["count"] == 1
+    assert row["mean"] == 70.0
+
+def test_watermark_round_trip():
+    store = PipelineStatsStore(':memory:')
+    assert store.watermark() == 0
+    store.set_watermark(1234)
+    assert store.watermark() == 1234
+
+class FakeFetcher:
+    """Serves pipelines 1..count, the given IDs still running, like pipelines.list(sort='asc')"""
+
+    def __init__(self, count, running=(), broken=(), created_year=2099):
+        self.calls = []
+        self.broken = broken
+        self.pipelines = [
+            SimpleNamespace(id=pipeline_id, ref="production",
+                            status="running" if pipeline_id in running else "success",
+                            created_at=f"{created_year}-01-01T00:00:{pipeline_id:02d}.000Z",
+                            jobs=SimpleNamespace(list=lambda **kwargs: []))
+            for pipeline_id in range(1, count + 1)
+        ]
+        self.project = SimpleNamespace(pipelines=SimpleNamespace(list=self.list))
+
+    def list(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(self.pipelines)
+
+    def get_pipeline_variables(self, pipeline):
+        if pipeline.id in self.broken:
+            raise RuntimeError("500 Internal Server Error")
+        return {"service": "ejar3-sec"}
+
+def test_refresh_stats_backfills_oldest_first_up_to_limit():
+    store = PipelineStatsStore(':memory:')
+    fetcher = FakeFetcher(5)
+
+    assert refresh_stats(fetcher, store, workers=1, limit=3) == 3
+    assert store.watermark() == 3
+    assert fetcher.calls[0]["sort"] == "asc"
+
+    assert refresh_stats(fetcher, store, workers=1, limit=3) == 2
+    assert store.watermark() == 5
+    assert fetcher.calls[1]["updated_after"] == "2099-01-01T00:00:03.000Z"
+
+def test_refresh_stats_holds_watermark_below_running_pipeline():
+    store = PipelineStatsStore(':memory:')
+    refresh_stats(FakeFetcher(5, running={3}), store, workers=1)
+    assert store.watermark() == 2
+    assert store.count() == 5
+
+def test_refresh_stats_holds_watermark_below_recent_fetch_failure():
+    store = PipelineStatsStore(':memory:')
+    refresh_stats(FakeFetcher(5, broken={2}), store, workers=1)
+    assert store.watermark() == 1
+
+def test_refresh_stats_skips_old_fetch_failure():
+    store = PipelineStatsStore(':memory:')
+    refresh_stats(FakeFetcher(5, broken={2}, created_year=2020), store, workers=1)
+    assert store.watermark() == 5
+    assert store.count() == 4
@@ -0,0 +1,53 @@
+import json
+import time
+
+from ref_catalog import DEFAULT_REFS, RefCatalog
+
+def test_defaults_until_filled(tmp_path):
+    catalog = RefCatalog(str(tmp_path / "catalog.json"))
+    assert catalog.refs() == DEFAULT_REFS
+    assert catalog.validate("production", "ejar3-sec") == []
+
+def test_validate_reports_unknown_branch_and_service(tmp_path):
+    catalog = RefCatalog(str(tmp_path / "catalog.json"))
+    errors = catalog.validate("prod", "ejar3-unknown")
+    assert len(errors) == 2
+    assert errors[0].startswith("Unknown branch 'prod'")
+    assert errors[1].startswith("Unknown ejar service 'ejar3-unknown'")
+
+def test_branch_matching_ignores_case(tmp_path):
+    catalog = RefCatalog(str(tmp_path / "catalog.json"))
+    assert catalog.validate("Production", "ejar3-sec") == []
+    assert catalog.resolve_ref("UAT") == "uat"
+    assert catalog.resolve_ref("staging") is None
+
+def test_validate_entries_defaults_branch_to_production(tmp_path):
+    catalog = RefCatalog(str(tmp_path / "catalog.json"))
+    problems = catalog.validate_entries([
+        {"ejar_service": "ejar3-sec"},
+        {"branch": "nope", "ejar_service": "ejar3-sec"},
+    ])
+    assert list(problems) == [1]
+
+def test_update_persists_and_expires_after_ttl(tmp_path):
+    path = tmp_path / "catalog.json"
+    catalog = RefCatalog(str(path), ttl=60)
+    catalog.update("refs", ["main", "main", "", "release"])
+    assert catalog.is_fresh("refs")
+    assert json.loads(path.read_text())["refs"] == ["main", "release"]
+
+    reloaded = RefCatalog(str(path), ttl=60)
+    assert reloaded.refs() == ["main", "release"]
+    reloaded.data["refs_fetched_at"] = time.time() - 61
+    assert not reloaded.is_fresh("refs")
+
+def test_refresh_refs_skips_api_while_fresh(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITLAB_ACCESS_TOKEN", "token")
+    catalog = RefCatalog(str(tmp_path / "catalog.json"))
+    catalog.update("refs", ["main"])
+
+    def fail():
+        raise AssertionError("fetcher should not be created while the catalog is fresh")
+
+    catalog.refresh_refs(fetcher_factory=fail)
+    assert catalog.refs() == ["main"]
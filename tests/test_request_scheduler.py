@@ -0,0 +1,41 @@
+import threading
+import time
+
+from request_scheduler import PRIORITY_ACTION, PRIORITY_POLL, RequestScheduler
+
+def test_burst_is_served_without_waiting():
+    scheduler = RequestScheduler(rate=1, burst=3)
+    started = time.monotonic()
+    for _ in range(3):
+        scheduler.acquire()
+    assert time.monotonic() - started < 0.1
+    assert scheduler.metrics()["throttled"] == 0
+
+def test_queued_actions_overtake_polling():
+    scheduler = RequestScheduler(rate=50, burst=1)
+    scheduler.acquire()
+
+    order = []
+
+    def request(priority, index):
+        scheduler.acquire(priority)
+        order.append(priority)
+
+    threads = [threading.Thread(target=request, args=(PRIORITY_POLL if index % 2 else PRIORITY_ACTION, index))
+               for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert order == [PRIORITY_ACTION] * 3 + [PRIORITY_POLL] * 3
+    assert scheduler.metrics()["max_queue_depth"] >= 2
+
+def test_pauses_until_reset_when_budget_is_low():
+    scheduler = RequestScheduler(rate=100, burst=10, reserve=5)
+    scheduler.update_from_headers({"RateLimit-Remaining": "3", "RateLimit-Reset": str(time.time() + 0.3)})
+
+    started = time.monotonic()
+    scheduler.acquire()
+    assert time.monotonic() - started >= 0.2
+    assert scheduler.metrics()["rate_limit_pauses"] == 1
@@ -0,0 +1,48 @@
+import time
+
+from stage_history import DEFAULT_SCHEDULES, MIN_SAMPLES, StageHistory, percentile
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([10, 20], 50) == 15
+    assert percentile([], 50) is None
+
+def test_schedule_uses_defaults_without_history():
+    history = StageHistory(':memory:')
+    schedule = history.schedule("ejar3-sec", "production", "runscript")
+    assert schedule.samples == 0
+    assert schedule.deadline == DEFAULT_SCHEDULES["runscript"]["deadline"]
+
+def test_schedule_follows_recorded_durations():
+    history = StageHistory(':memory:')
+    for duration in (100, 110, 120, 130, 140):
+        history.record("ejar3-sec", "production", "runscript", duration)
+    history.record("ejar3-sec", "production", "runscript", 5, success=False)
+    history.record("ejar3-core-app", "production", "runscript", 900)
+
+    schedule = history.schedule("ejar3-sec", "production", "runscript")
+    assert schedule.samples == MIN_SAMPLES
+    assert schedule.expected == 120
+    assert schedule.deadline > 138
+
+def test_poll_delay_shrinks_towards_expected_completion():
+    history = StageHistory(':memory:')
+    schedule = history.schedule("ejar3-sec", "production", "runscript")
+    limits = DEFAULT_SCHEDULES["runscript"]
+
+    delays = []
+    for elapsed in (0, 200, 280, 300, 400):
+        schedule.started = time.monotonic() - elapsed
+        delays.append(schedule.next_delay())
+
+    assert delays[0] == limits["max_interval"]
+    assert delays[0] > delays[1] > delays[2]
+    assert delays[3] == limits["min_interval"]
+    assert delays[4] > delays[3]
+
+def test_poll_schedule_expires_at_deadline():
+    schedule = StageHistory(':memory:').schedule("ejar3-sec", "production", "request")
+    assert not schedule.expired()
+    schedule.started = time.monotonic() - schedule.deadline
+    assert schedule.expired()
+    assert schedule.next_delay() == 0